@@ -0,0 +1,154 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum, Case, When, Value, IntegerField
+from django.db.models.functions import TruncDate
+from django.db.models.query import QuerySet
+from django.utils import timezone
+
+from .models import (
+    Module, Lesson, Assignment, Quiz, Enrollment, LessonCompletion, Result, Submission,
+    AnalyticsWatermark, CourseEnrollmentDaily, LessonCompletionRollup, QuizScoreRollup, AssignmentGradeRollup,
+)
+
+CHUNK = 50000
+
+
+def _add(model, lookup, field, amount, defaults=None, **extra):
+    """Increment a rollup counter, creating the row on first sight."""
+    updates = {field: F(field) + amount, **{k: F(k) + v for k, v in extra.items()}}
+    if not model.objects.filter(**lookup).update(**updates):
+        model.objects.create(**lookup, **(defaults or {}), **{field: amount}, **extra)
+
+
+def _fold_enrollments(rows):
+    groups = rows.annotate(day=TruncDate('enrolled_at')).values('course_id', 'day').annotate(n=Count('id')).order_by()
+    for g in groups:
+        _add(CourseEnrollmentDaily, {'course_id': g['course_id'], 'date': g['day']}, 'enrollments', g['n'])
+
+
+def _fold_completions(rows):
+    groups = rows.values('lesson_id', 'lesson__module__course_id').annotate(n=Count('id')).order_by()
+    for g in groups:
+        _add(LessonCompletionRollup, {'lesson_id': g['lesson_id']}, 'completions', g['n'],
+             defaults={'course_id': g['lesson__module__course_id']})
+
+
+def _fold_results(rows):
+    groups = rows.values('quiz_id', 'quiz__module__course_id').annotate(n=Count('id'), total=Sum('score')).order_by()
+    for g in groups:
+        _add(QuizScoreRollup, {'quiz_id': g['quiz_id']}, 'attempts', g['n'],
+             defaults={'course_id': g['quiz__module__course_id']}, score_sum=g['total'] or 0)
+
+
+# Append-only sources folded in by primary-key watermark: (model, timestamp field, folder)
+SOURCES = {
+    'enrollments': (Enrollment, 'enrolled_at', _fold_enrollments),
+    'lesson_completions': (LessonCompletion, 'completed_at', _fold_completions),
+    'results': (Result, 'attempted_at', _fold_results),
+}
+
+
+def process_new_rows(settle_seconds=30, chunk=CHUNK):
+    """
+    Fold rows added since each source's watermark into the rollups. Rows
+    younger than `settle_seconds` wait for the next run so a transaction that
+    commits late cannot slip in behind the watermark.
+    """
+    processed = {}
+    cutoff = timezone.now() - timedelta(seconds=settle_seconds)
+    for name, (model, stamp, fold) in SOURCES.items():
+        watermark, _ = AnalyticsWatermark.objects.get_or_create(name=name)
+        high = model.objects.filter(**{f'{stamp}__lte': cutoff}).aggregate(m=Max('id'))['m'] or 0
+        start, count = watermark.last_id, 0
+        while start < high:
+            end = min(start + chunk, high)
+            with transaction.atomic():
+                rows = model.objects.filter(pk__gt=start, pk__lte=end)
+                fold(rows)
+                AnalyticsWatermark.objects.filter(pk=watermark.pk).update(last_id=end)
+            count += end - start
+            start = end
+        processed[name] = count
+    return processed
+
+
+def forget_deleted_row(name, instance, fold):
+    """Undo a deleted row's contribution if the watermark had already counted it."""
+    if AnalyticsWatermark.objects.filter(name=name, last_id__gte=instance.pk).exists():
+        fold(instance)
+
+
+def is_direct_delete(sender, origin):
+    # Rows removed by a cascade from their course/lesson/quiz take their rollups with them
+    return isinstance(origin, sender) or (isinstance(origin, QuerySet) and origin.model is sender)
+
+
+GRADE_BUCKET = Case(
+    *[When(grade__lt=(b + 1) * 10, then=Value(b)) for b in range(9)],
+    default=Value(9), output_field=IntegerField(),
+)
+
+
+def refresh_assignment_grades(assignment_id):
+    """Grades change in place, so an assignment's distribution is recomputed whole (one class worth of rows)."""
+    course_id = Assignment.objects.filter(pk=assignment_id).values_list('module__course_id', flat=True).first()
+    if course_id is None: return
+    buckets = (Submission.objects.filter(assignment_id=assignment_id, grade__isnull=False)
+               .annotate(bucket=GRADE_BUCKET).values('bucket').annotate(n=Count('id')).order_by())
+    with transaction.atomic():
+        AssignmentGradeRollup.objects.filter(assignment_id=assignment_id).delete()
+        AssignmentGradeRollup.objects.bulk_create([
+            AssignmentGradeRollup(course_id=course_id, assignment_id=assignment_id, bucket=b['bucket'], submissions=b['n'])
+            for b in buckets
+        ])
+
+
+def rebuild(settle_seconds=30):
+    """Drop every rollup and rebuild it from scratch."""
+    with transaction.atomic():
+        for model in (CourseEnrollmentDaily, LessonCompletionRollup, QuizScoreRollup, AssignmentGradeRollup, AnalyticsWatermark):
+            model.objects.all().delete()
+    for assignment_id in Assignment.objects.values_list('id', flat=True).iterator():
+        refresh_assignment_grades(assignment_id)
+    return process_new_rows(settle_seconds)
+
+
+def course_report(course_id):
+    """Instructor dashboard payload, read from the rollup tables only."""
+    enrollments = list(CourseEnrollmentDaily.objects.filter(course_id=course_id).order_by('date').values_list('date', 'enrollments'))
+
+    completions = dict(LessonCompletionRollup.objects.filter(course_id=course_id).values_list('lesson_id', 'completions'))
+    funnel = []
+    lessons = Lesson.objects.filter(module__course_id=course_id).values_list('module_id', 'id', 'title')
+    by_module = {}
+    for module_id, lesson_id, title in lessons:
+        by_module.setdefault(module_id, []).append({'lesson': lesson_id, 'title': title, 'completions': completions.get(lesson_id, 0)})
+    for module_id, title in Module.objects.filter(course_id=course_id).values_list('id', 'title'):
+        rows = by_module.get(module_id, [])
+        funnel.append({'module': module_id, 'title': title, 'completions': sum(r['completions'] for r in rows), 'lessons': rows})
+
+    quizzes = [
+        {'quiz': quiz_id, 'title': title, 'attempts': attempts or 0,
+         'average_score': round(total / attempts, 2) if attempts else None}
+        for quiz_id, title, attempts, total in Quiz.objects.filter(module__course_id=course_id)
+        .values_list('id', 'title', 'score_rollup__attempts', 'score_rollup__score_sum')
+    ]
+
+    distribution = {}
+    for assignment_id, bucket, n in AssignmentGradeRollup.objects.filter(course_id=course_id).values_list('assignment_id', 'bucket', 'submissions'):
+        distribution.setdefault(assignment_id, {})[f'{bucket * 10}-{bucket * 10 + 9 if bucket < 9 else 100}'] = n
+    assignments = [
+        {'assignment': assignment_id, 'title': title, 'grades': distribution.get(assignment_id, {})}
+        for assignment_id, title in Assignment.objects.filter(module__course_id=course_id).values_list('id', 'title')
+    ]
+
+    return {
+        'enrollments': {
+            'total': sum(n for _, n in enrollments),
+            'daily': [{'date': day, 'count': n} for day, n in enrollments],
+        },
+        'funnel': funnel,
+        'quizzes': quizzes,
+        'assignments': assignments,
+    }
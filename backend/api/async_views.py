@@ -0,0 +1,146 @@
+"""
+Async versions of the read-heavy endpoints, routed in front of the DRF
+viewsets when ASYNC_VIEWS is on (smartlms/asgi.py turns it on). They return
+the same payloads: serializers, pagination and the content cache are shared
+with the sync views, only the waiting on the database happens off the event
+loop. Any method other than GET is handed to the regular viewset.
+The server-sent events stream (api.events) only exists here.
+"""
+from functools import wraps
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .authentication import CachedJWTAuthentication, aget_user
+from .cache import content_cache, cache_variant, cache_etag, cache_key, record
+from .events import redeem_ticket, stream
+from .models import Course, Lesson, Enrollment, Certificate
+from .pagination import KeysetPagination
+from .prefetch import with_prefetch_plan
+from .serializers import CourseSummarySerializer, LessonSerializer, UserSerializer, CertificateSerializer
+from .views import UserViewSet, CourseViewSet, LessonViewSet, CertificateViewSet, comment_preview_size, with_comment_preview
+
+renderer = JSONRenderer()
+
+
+def render(data, status=200, headers=None):
+    return HttpResponse(renderer.render(data), status=status, content_type='application/json', headers=headers)
+
+
+async def authenticate(request, stream_ticket=False):
+    """JWT authentication with the user lookup (on a cache miss) done through the async ORM."""
+    auth = CachedJWTAuthentication()
+    header = auth.get_header(request)
+    raw = auth.get_raw_token(header) if header is not None else None
+    # EventSource cannot set headers, so streams accept a single-use ?ticket= instead
+    if raw is None and stream_ticket: return await redeem_ticket(request.GET.get('ticket')) or AnonymousUser()
+    if raw is None: return AnonymousUser()
+    return await aget_user(auth.get_validated_token(raw))
+
+
+def async_endpoint(fallback, allow_anonymous=False, stream_ticket=False):
+    """Authenticate, wrap the request for the serializers and map API exceptions to responses."""
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                if fallback is None: return HttpResponseNotAllowed(['GET'])
+                return await sync_to_async(fallback)(request, *args, **kwargs)
+            try:
+                drf_request = Request(request)
+                drf_request.user = await authenticate(request, stream_ticket)
+                if not allow_anonymous and not drf_request.user.is_authenticated: raise NotAuthenticated()
+                return await view(drf_request, *args, **kwargs)
+            except APIException as exc:
+                return render(exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}, status=exc.status_code)
+        return wrapper
+    return decorator
+
+
+async def paginated(request, queryset, ordering, serializer_class):
+    paginator = KeysetPagination()
+    view = SimpleNamespace(cursor_ordering=ordering)
+    page = await sync_to_async(paginator.paginate_queryset)(queryset, request, view)
+    data = serializer_class(page, many=True, context={'request': request}).data
+    return render(paginator.get_paginated_response(data).data)
+
+
+@async_endpoint(CourseViewSet.as_view({'get': 'catalog'}), allow_anonymous=True)
+async def course_catalog(request):
+    queryset = with_prefetch_plan(Course.objects.all(), CourseSummarySerializer, context={'request': request})
+    return await paginated(request, queryset, CourseViewSet.cursor_ordering, CourseSummarySerializer)
+
+
+@async_endpoint(LessonViewSet.as_view({'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}))
+async def lesson_detail(request, pk):
+    version = await Lesson.objects.filter(pk=pk).values_list(LessonViewSet.content_version_path, flat=True).afirst()
+    if version is None: raise NotFound()
+
+    kind = LessonViewSet.cache_kind
+    variant = cache_variant(request.query_params.lists(), 'json', request.build_absolute_uri('/'))
+    etag = cache_etag(kind, pk, version, variant)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        record(kind, 'not_modified')
+        return HttpResponse(status=304, headers={'ETag': etag})
+
+    key = cache_key(kind, pk, version, variant)
+    data = await content_cache.aget(key)
+    if data is None:
+        record(kind, 'miss')
+        preview = comment_preview_size(request)
+        context = {'request': request, 'comment_preview': preview}
+        queryset = with_prefetch_plan(Lesson.objects.filter(pk=pk), LessonSerializer, context=context)
+        lesson = await with_comment_preview(queryset, preview).afirst()
+        if lesson is None: raise NotFound()
+        data = LessonSerializer(lesson, context=context).data
+        await content_cache.aset(key, data)
+        outcome = 'MISS'
+    else:
+        record(kind, 'hit')
+        outcome = 'HIT'
+    return render(data, headers={'ETag': etag, 'X-Cache': outcome})
+
+
+@async_endpoint(UserViewSet.as_view({'get': 'me'}))
+async def users_me(request):
+    return render(UserSerializer(request.user, context={'request': request}).data)
+
+
+@async_endpoint(CertificateViewSet.as_view({'get': 'list'}))
+async def certificate_list(request):
+    queryset = with_prefetch_plan(Certificate.objects.filter(student=request.user), CertificateSerializer)
+    return await paginated(request, queryset, CertificateViewSet.cursor_ordering, CertificateSerializer)
+
+
+def _ids(value):
+    return {int(pk) for pk in value.split(',') if pk.strip().isdigit()}
+
+
+@async_endpoint(None, stream_ticket=True)
+async def event_stream(request):
+    """
+    text/event-stream of new announcements in the user's courses (or ?course=1,2)
+    and new comments on ?lesson=1,2 where the user may read them.
+    """
+    user = request.user
+    readable = {pk async for pk in Enrollment.objects.filter(student=user).values_list('course_id', flat=True)}
+    readable |= {pk async for pk in Course.objects.filter(instructor=user).values_list('id', flat=True)}
+    courses = readable
+    if 'course' in request.query_params:
+        requested = _ids(request.query_params['course'])
+        courses = requested if user.is_staff else readable & requested
+    lessons = Lesson.objects.filter(pk__in=_ids(request.query_params.get('lesson', '')))
+    if not user.is_staff: lessons = lessons.filter(module__course__in=readable)
+    channels = [f'course:{pk}' for pk in courses] + [f'lesson:{pk}' async for pk in lessons.values_list('id', flat=True)]
+
+    return StreamingHttpResponse(stream(channels), content_type='text/event-stream', headers={
+        'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no',
+    })
@@ -0,0 +1,133 @@
+"""
+JWT authentication without a database round trip on most requests. Tokens
+carry the user's token_version ("ver" claim), and the user with its role is
+kept in a small per-process LRU keyed by (user id, version) for
+AUTH_CACHE_SECONDS. Saving a user or role evicts the entries in this process
+(see signals.py); other processes pick the change up when their entry expires.
+A password change bumps token_version, which retires every earlier token.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .models import User
+
+VERSION_CLAIM = 'ver'
+
+
+class SnapshotCache:
+    """A thread-safe LRU of user snapshots with a time-to-live."""
+    def __init__(self, size, ttl):
+        self.size, self.ttl = size, ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None: return None
+            expires, user = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+        # Each request gets its own instance; the role is shared and treated as read-only
+        return copy.copy(user)
+
+    def set(self, key, user):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, copy.copy(user))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def evict(self, match):
+        with self.lock:
+            for key in [key for key, (_, user) in self.entries.items() if match(user)]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+snapshots = SnapshotCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_SECONDS)
+
+
+def evict_user(user_id):
+    snapshots.evict(lambda user: user.pk == user_id)
+
+
+def evict_role(role_id):
+    snapshots.evict(lambda user: user.role_id == role_id)
+
+
+def versioned(token, user):
+    token[VERSION_CLAIM] = user.token_version
+    return token
+
+
+def token_key(validated_token):
+    try:
+        user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken(_('Token contained no recognizable user identification'))
+    # Tokens issued before versions existed count as version 0
+    return user_id, validated_token.get(VERSION_CLAIM, 0)
+
+
+def check_user(user, version):
+    if user is None: raise AuthenticationFailed(_('User not found'), code='user_not_found')
+    if not user.is_active: raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+    if user.token_version != version:
+        raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+    return user
+
+
+def user_queryset(user_id):
+    return User.objects.select_related('role').filter(**{jwt_settings.USER_ID_FIELD: user_id})
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        key = token_key(validated_token)
+        user = snapshots.get(key)
+        if user is None:
+            user = check_user(user_queryset(key[0]).first(), key[1])
+            snapshots.set(key, user)
+        return user
+
+
+async def aget_user(validated_token):
+    """CachedJWTAuthentication.get_user for async views."""
+    key = token_key(validated_token)
+    user = snapshots.get(key)
+    if user is None:
+        user = check_user(await user_queryset(key[0]).afirst(), key[1])
+        snapshots.set(key, user)
+    return user
+
+
+class VersionedTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return versioned(super().get_token(user), user)
+
+
+class VersionedTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        current = (User.objects.filter(**{jwt_settings.USER_ID_FIELD: refresh.get(jwt_settings.USER_ID_CLAIM)})
+                   .values_list('token_version', flat=True).first())
+        if current is not None and refresh.get(VERSION_CLAIM, 0) != current:
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return super().validate(attrs)
@@ -0,0 +1,132 @@
+import json
+import os
+import time
+
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import versioned
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered: return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def auth_headers(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {versioned(AccessToken.for_user(user), user)}'} if user else {}
+
+
+def measure(url, user=None, iterations=50, warmup=5, method='get', data=None):
+    """Issue the same request repeatedly through the Django test client and summarize it."""
+    client = Client()
+    headers = auth_headers(user)
+    call = getattr(client, method)
+    for _ in range(warmup):
+        call(url, data, **headers)
+
+    latencies, queries, sizes = [], [], []
+    for _ in range(iterations):
+        with CaptureQueriesContext(connections['default']) as ctx:
+            start = time.perf_counter()
+            response = call(url, data, **headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method.upper()} {url} returned {response.status_code}')
+        queries.append(len(ctx.captured_queries))
+        sizes.append(len(response.content) if not response.streaming else 0)
+
+    return {
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'queries': max(queries),
+        'bytes': max(sizes),
+    }
+
+
+def load_baseline(path):
+    if not os.path.exists(path): return None
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def save_baseline(path, results):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as fh:
+        json.dump(results, fh, indent=2, sort_keys=True)
+
+
+def regressions(results, baseline, threshold, noise_ms=2.0):
+    """Compare against a stored run: more queries, or p95 / bytes beyond the threshold, is a regression."""
+    found = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None: continue
+        if current['queries'] > previous['queries']:
+            found.append(f"{name}: queries {previous['queries']} -> {current['queries']}")
+        if current['p95_ms'] > previous['p95_ms'] * (1 + threshold) + noise_ms:
+            found.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current['bytes'] > previous['bytes'] * (1 + threshold):
+            found.append(f"{name}: bytes {previous['bytes']} -> {current['bytes']}")
+    return found
+
+
+def load_test(base_url, paths, headers, concurrency, duration):
+    """
+    Hit a running server with `concurrency` keep-alive clients cycling through
+    `paths` for `duration` seconds. Unlike measure() this goes over real HTTP,
+    so it compares deployments (sync vs async workers) rather than code paths.
+    """
+    import http.client
+    import itertools
+    import threading
+    from urllib.parse import urlsplit
+
+    target = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if target.scheme == 'https' else http.client.HTTPConnection
+    deadline = time.perf_counter() + duration
+    latencies, errors, lock = [], [0], threading.Lock()
+
+    def client(offset):
+        conn = connection_class(target.hostname, target.port, timeout=30)
+        mine, failed = [], 0
+        for path in itertools.islice(itertools.cycle(paths), offset, None):
+            if time.perf_counter() >= deadline: break
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400: failed += 1
+                else: mine.append((time.perf_counter() - start) * 1000)
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = connection_class(target.hostname, target.port, timeout=30)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }
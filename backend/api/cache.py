@@ -0,0 +1,105 @@
+import hashlib
+import threading
+from collections import Counter
+
+from django.core.cache import caches
+from django.db.models import F, Subquery
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Course, Module, Lesson
+
+content_cache = caches['content']
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def record(kind, outcome):
+    with _stats_lock:
+        _stats[(kind, outcome)] += 1
+
+
+def stats():
+    """Hit/miss/not-modified counters for this process, per cached resource kind."""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    report = {}
+    for (kind, outcome), count in snapshot.items():
+        report.setdefault(kind, {'hit': 0, 'miss': 0, 'not_modified': 0})[outcome] = count
+    for row in report.values():
+        lookups = row['hit'] + row['miss']
+        row['hit_rate'] = round(row['hit'] / lookups, 4) if lookups else None
+    return report
+
+
+def bump_content_version(course_id=None, module_id=None, lesson_id=None, courses=None):
+    """
+    Invalidate every cached tree of a course (or of a Course queryset) by
+    moving it to a new version. This is the only writer (Course.save() leaves
+    the column alone), so a version is never issued twice.
+    """
+    if lesson_id is not None:
+        course_id = Subquery(Lesson.objects.filter(pk=lesson_id).values('module__course_id'))
+    elif module_id is not None:
+        course_id = Subquery(Module.objects.filter(pk=module_id).values('course_id'))
+    if courses is None: courses = Course.objects.filter(pk=course_id)
+    courses.update(content_version=F('content_version') + 1)
+
+
+def cache_variant(params, renderer_format, base_url):
+    # Host is part of the variant because file fields serialize to absolute URLs
+    raw = repr((sorted(params), renderer_format, base_url))
+    return hashlib.md5(raw.encode()).hexdigest()[:12]
+
+
+def cache_etag(kind, pk, version, variant):
+    return f'"{kind}-{pk}-v{version}-{variant}"'
+
+
+def cache_key(kind, pk, version, variant):
+    return f'tree:{kind}:{pk}:{version}:{variant}'
+
+
+class VersionedCacheMixin:
+    """
+    Serves retrieve() from the content cache. Entries are keyed by the owning
+    course's content_version, which signals bump on any change to the tree, so
+    stale entries are never read and simply age out. The same version backs
+    an ETag, letting clients revalidate with If-None-Match for a 304.
+    """
+    cache_kind = None
+    # values_list() path from this viewset's model to Course.content_version
+    content_version_path = None
+
+    def cache_variant(self, request):
+        return cache_variant(request.query_params.lists(), request.accepted_renderer.format, request.build_absolute_uri('/'))
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        model = self.get_serializer_class().Meta.model
+        try:
+            version = model.objects.filter(pk=pk).values_list(self.content_version_path, flat=True).first()
+        except (TypeError, ValueError):
+            version = None
+        if version is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        variant = self.cache_variant(request)
+        etag = cache_etag(self.cache_kind, pk, version, variant)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            record(self.cache_kind, 'not_modified')
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        key = cache_key(self.cache_kind, pk, version, variant)
+        data = content_cache.get(key)
+        if data is None:
+            record(self.cache_kind, 'miss')
+            data = self.get_serializer(self.get_object()).data
+            content_cache.set(key, data)
+            outcome = 'MISS'
+        else:
+            record(self.cache_kind, 'hit')
+            outcome = 'HIT'
+        return Response(data, headers={'ETag': etag, 'X-Cache': outcome})
@@ -0,0 +1,64 @@
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Course, Module, Lesson, Enrollment, LessonCompletion, Comment
+
+
+def _count(queryset, group_by):
+    return Coalesce(Subquery(queryset.order_by().values(group_by).annotate(n=Count('id')).values('n')), 0)
+
+
+def recount_courses(courses=None):
+    courses = Course.objects.all() if courses is None else courses
+    lessons = Lesson.objects.filter(module__course=OuterRef('pk'))
+    modules = Module.objects.filter(course=OuterRef('pk'))
+    return courses.update(lesson_count=_count(lessons, 'module__course'), module_count=_count(modules, 'course'))
+
+
+def recount_enrollments(enrollments=None):
+    enrollments = Enrollment.objects.all() if enrollments is None else enrollments
+    done = LessonCompletion.objects.filter(student=OuterRef('student'), lesson__module__course=OuterRef('course'))
+    # .update() skips auto_now; progress changes must still reach delta-sync clients
+    return enrollments.update(completed_lessons=_count(done, 'student'), updated_at=timezone.now())
+
+
+def recount_lessons(lessons=None):
+    lessons = Lesson.objects.all() if lessons is None else lessons
+    return lessons.update(comment_count=_count(Comment.objects.filter(lesson=OuterRef('pk')), 'lesson'))
+
+
+def recount_course_tree(course_ids):
+    course_ids = [pk for pk in set(course_ids) if pk is not None]
+    if not course_ids: return
+    recount_courses(Course.objects.filter(pk__in=course_ids))
+    recount_enrollments(Enrollment.objects.filter(course_id__in=course_ids))
+
+
+def _shifted(field, delta):
+    # Counter columns are unsigned on MySQL, so never let the expression go below zero.
+    if delta >= 0: return F(field) + delta
+    return Case(When(**{f'{field}__gte': -delta, 'then': F(field) - (-delta)}), default=Value(0))
+
+
+# The course is resolved in a scalar subquery rather than a join so the
+# UPDATE stays a single statement on MySQL.
+
+def shift_module_count(course_id, delta):
+    Course.objects.filter(pk=course_id).update(module_count=_shifted('module_count', delta))
+
+
+def shift_lesson_count(module_id, delta):
+    course_id = Subquery(Module.objects.filter(pk=module_id).values('course_id'))
+    Course.objects.filter(pk=course_id).update(lesson_count=_shifted('lesson_count', delta))
+
+
+def shift_comment_count(lesson_id, delta):
+    Lesson.objects.filter(pk=lesson_id).update(comment_count=_shifted('comment_count', delta))
+
+
+def shift_completed_lessons(student_id, lesson_id, delta):
+    course_id = Subquery(Lesson.objects.filter(pk=lesson_id).values('module__course_id'))
+    Enrollment.objects.filter(student_id=student_id, course_id=course_id).update(
+        completed_lessons=_shifted('completed_lessons', delta), updated_at=timezone.now()
+    )
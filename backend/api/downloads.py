@@ -0,0 +1,87 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.http import content_disposition_header
+
+# MEDIA_ROOT prefixes that are never served publicly, only through serve_protected()
+PROTECTED_PREFIXES = ('submissions/', 'uploads/')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def byte_range(header, size):
+    """(start, end) inclusive for a single-range Range header, or None to send the whole file."""
+    match = RANGE.match(header.strip()) if header else None
+    if match is None or match.groups() == ('', ''): return None
+    start, end = match.groups()
+    if start == '':
+        start, end = max(0, size - int(end)), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end: raise RangeNotSatisfiable()
+    return start, end
+
+
+class _Slice:
+    """Read at most `length` bytes from an open file (for bounded ranges)."""
+    def __init__(self, handle, length):
+        self.handle, self.remaining = handle, length
+
+    def read(self, size=-1):
+        if self.remaining <= 0: return b''
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.handle.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.handle.close()
+
+
+def serve_protected(request, fieldfile, filename=None):
+    """
+    Send a file the caller has already been authorized for. Behind nginx
+    (MEDIA_ACCEL_REDIRECT=True) the response is only an X-Accel-Redirect
+    header and nginx streams the bytes, ranges included. Otherwise Django
+    streams it with FileResponse, which the WSGI server turns into sendfile.
+    """
+    filename = filename or os.path.basename(fieldfile.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    disposition = content_disposition_header(request.query_params.get('inline') is None, filename)
+
+    if settings.MEDIA_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(fieldfile.name)
+        response['Content-Disposition'] = disposition
+        return response
+
+    size = fieldfile.size
+    try:
+        # With If-Range we cannot tell whether the client's copy is current, so send it all
+        span = None if 'If-Range' in request.headers else byte_range(request.headers.get('Range'), size)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    handle = fieldfile.storage.open(fieldfile.name, 'rb')
+    if span is None:
+        response = FileResponse(handle, content_type=content_type)
+    else:
+        start, end = span
+        handle.seek(start)
+        # An open-ended range ("resume from byte N") keeps the real file object so sendfile still applies
+        body = handle if end == size - 1 else _Slice(handle, end - start + 1)
+        response = FileResponse(body, status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = disposition
+    return response
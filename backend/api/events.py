@@ -0,0 +1,167 @@
+"""
+Server-sent events for new announcements and comments. Subscribers hold a
+bounded queue on the event loop of an ASGI worker; channels are
+"course:<id>" (announcements, for the course's students and instructor) and
+"lesson:<id>" (comments, for whoever has the lesson open).
+
+Rows created in this process are published on commit. Rows created by other
+workers (WSGI or ASGI) are picked up by polling the tables every
+EVENTS_POLL_SECONDS while this process has subscribers, so no shared broker
+is needed. Each row is published once per process whichever path sees it
+first. Clients that reconnect catch up through the delta-sync feed (api.sync).
+
+EventSource cannot send an Authorization header, so a client first POSTs to
+/api/events/ticket/ and opens the stream with ?ticket=: a single-use key that
+expires after EVENTS_TICKET_SECONDS, so it is worthless once it reaches a log.
+"""
+import asyncio
+import json
+import secrets
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Announcement, Comment, StreamTicket
+from .serializers import AnnouncementSerializer, CommentSerializer
+
+SEEN_LIMIT = 10000
+RESET = None  # queued for a subscriber that fell too far behind; its stream ends and the client resyncs
+
+
+def announcement_event(announcement):
+    return f'course:{announcement.course_id}', 'announcement', AnnouncementSerializer(announcement).data
+
+
+def comment_event(comment):
+    return f'lesson:{comment.lesson_id}', 'comment', CommentSerializer(comment).data
+
+
+def format_event(kind, data):
+    return f'id: {kind}-{data["id"]}\nevent: {kind}\ndata: {json.dumps(data, default=str)}\n\n'
+
+
+class Subscription:
+    def __init__(self, channels):
+        self.channels = frozenset(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+
+    def offer(self, message):
+        # Runs on the subscriber's loop
+        if self.queue.full():
+            while not self.queue.empty(): self.queue.get_nowait()
+            message = RESET
+        self.queue.put_nowait(message)
+
+
+class Broker:
+    """In-process fan-out from channels to subscriber queues. publish() may be called from any thread."""
+    def __init__(self):
+        self.channels = {}
+        self.seen = OrderedDict()
+        self.lock = threading.Lock()
+        self.poller = None
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels)
+        with self.lock:
+            for channel in subscription.channels:
+                self.channels.setdefault(channel, set()).add(subscription)
+        if settings.EVENTS_POLL_SECONDS and (self.poller is None or self.poller.done()):
+            self.poller = asyncio.create_task(poll(self))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                subscribers = self.channels.get(channel, set())
+                subscribers.discard(subscription)
+                if not subscribers: self.channels.pop(channel, None)
+
+    def has_subscribers(self, channel=None):
+        with self.lock:
+            return bool(self.channels) if channel is None else channel in self.channels
+
+    def first_sighting(self, kind, pk):
+        with self.lock:
+            if (kind, pk) in self.seen: return False
+            self.seen[(kind, pk)] = True
+            while len(self.seen) > SEEN_LIMIT:
+                self.seen.popitem(last=False)
+            return True
+
+    def publish(self, channel, kind, data):
+        if not self.first_sighting(kind, data['id']): return
+        with self.lock:
+            subscribers = list(self.channels.get(channel, ()))
+        message = format_event(kind, data)
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(subscription.offer, message)
+
+
+broker = Broker()
+
+
+def publish_on_commit(make_event, instance):
+    """Called from post_save; serializes the row only if this process has someone listening."""
+    if not broker.has_subscribers(): return
+    transaction.on_commit(lambda: broker.publish(*make_event(instance)))
+
+
+async def poll(broker):
+    """Publish rows other processes created. Looks back EVENTS_SETTLE_SECONDS to catch late commits."""
+    since = timezone.now()
+    settle = timedelta(seconds=settings.EVENTS_SETTLE_SECONDS)
+    while broker.has_subscribers():
+        await asyncio.sleep(settings.EVENTS_POLL_SECONDS)
+        started = timezone.now()
+        async for announcement in Announcement.objects.filter(created_at__gte=since - settle).order_by('id'):
+            broker.publish(*announcement_event(announcement))
+        comments = Comment.objects.select_related('user').filter(created_at__gte=since - settle).order_by('id')
+        async for comment in comments:
+            broker.publish(*comment_event(comment))
+        since = started
+
+
+def issue_ticket(user):
+    now = timezone.now()
+    StreamTicket.objects.filter(expires_at__lt=now).delete()
+    ticket = StreamTicket.objects.create(key=secrets.token_urlsafe(32), user=user,
+                                         expires_at=now + timedelta(seconds=settings.EVENTS_TICKET_SECONDS))
+    return ticket.key
+
+
+async def redeem_ticket(key):
+    """The ticket's user, or None. Deleting it first makes it single-use even when two requests race."""
+    if not key: return None
+    ticket = await StreamTicket.objects.select_related('user__role').filter(key=key).afirst()
+    if ticket is None or not (await StreamTicket.objects.filter(key=key).adelete())[0]: return None
+    if ticket.expires_at < timezone.now() or not ticket.user.is_active: return None
+    return ticket.user
+
+
+async def stream(channels):
+    """
+    The SSE body: events as they arrive, a comment line as keepalive when idle.
+    Subscribes only once the body is iterated, so a client that leaves before
+    then leaves nothing behind.
+    """
+    subscription = broker.subscribe(channels)
+    try:
+        yield f'retry: {settings.EVENTS_RETRY_MS}\n\n'
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), settings.EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if message is RESET:
+                yield 'event: reset\ndata: {}\n\n'
+                return
+            yield message
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,71 @@
+import csv
+import json
+from datetime import datetime
+
+from .models import Submission, Result, LessonCompletion
+
+CHUNK_SIZE = 2000
+
+# dataset -> (model, course filter, exported columns). Columns are values_list()
+# lookups; the first must be the primary key, which drives the keyset chunking.
+DATASETS = {
+    'submissions': (Submission, 'assignment__module__course_id', [
+        'id', 'assignment_id', 'assignment__title', 'student_id', 'student__username',
+        'submitted_at', 'grade', 'feedback',
+    ]),
+    'results': (Result, 'quiz__module__course_id', [
+        'id', 'quiz_id', 'quiz__title', 'student_id', 'student__username', 'score', 'attempted_at',
+    ]),
+    'progress': (LessonCompletion, 'lesson__module__course_id', [
+        'id', 'student_id', 'student__username', 'lesson__module_id', 'lesson__module__title',
+        'lesson_id', 'lesson__title', 'completed_at',
+    ]),
+}
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+
+def header(dataset):
+    return [column.replace('__', '_') for column in DATASETS[dataset][2]]
+
+
+def iter_rows(dataset, course_id, chunk_size=CHUNK_SIZE):
+    """
+    Yield value tuples for one course in primary-key order. Each chunk is its
+    own `WHERE pk > last LIMIT n` query, so memory stays flat on every backend
+    (the MySQL driver buffers whole result sets, even for .iterator()).
+    """
+    model, course_lookup, columns = DATASETS[dataset]
+    queryset = model.objects.filter(**{course_lookup: course_id}).order_by('pk').values_list(*columns)
+    last = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last)[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size: return
+        last = chunk[-1][0]
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def stream_csv(dataset, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header(dataset))
+    for row in rows:
+        yield writer.writerow([_plain(v) for v in row])
+
+
+def stream_jsonl(dataset, rows):
+    names = header(dataset)
+    for row in rows:
+        yield json.dumps(dict(zip(names, map(_plain, row)))) + '\n'
+
+
+def stream(dataset, course_id, output='csv'):
+    rows = iter_rows(dataset, course_id)
+    return stream_jsonl(dataset, rows) if output == 'jsonl' else stream_csv(dataset, rows)
@@ -0,0 +1,128 @@
+import threading
+from collections import OrderedDict
+
+from rest_framework import serializers
+
+from .models import Quiz
+
+SINGLE, MULTIPLE, TEXT = 'single', 'multiple', 'text'
+QUESTION_TYPES = (SINGLE, MULTIPLE, TEXT)
+
+
+def _fold(text):
+    return ' '.join(str(text).split()).casefold()
+
+
+def _is_index(value, choices):
+    # bool is an int subclass; True must not pass for choice 1
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value < len(choices)
+
+
+def _question_list(raw):
+    return raw.get('questions', []) if isinstance(raw, dict) else raw
+
+
+def public_questions(raw):
+    """The questions without their answers, whether stored canonically or as a legacy bare list."""
+    items = _question_list(raw)
+    if not isinstance(items, list): return {'questions': []}
+    return {'questions': [{k: v for k, v in q.items() if k != 'answer'} for q in items if isinstance(q, dict)]}
+
+
+def normalize_questions(raw):
+    """
+    Validate quiz questions and return them in the canonical stored shape:
+
+        {"questions": [{"id": "q1", "type": "single", "prompt": "...",
+                        "choices": ["a", "b"], "answer": 1, "points": 1}, ...]}
+
+    `answer` is a choice index for "single", a list of indexes for "multiple"
+    and a list of accepted strings (case and whitespace insensitive) for "text".
+    """
+    items = _question_list(raw)
+    if not isinstance(items, list):
+        raise serializers.ValidationError('questions must be a list.')
+    questions, seen = [], set()
+    for position, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            raise serializers.ValidationError(f'Question {position} must be an object.')
+        qid = str(item.get('id') or f'q{position}')
+        kind = item.get('type', SINGLE)
+        choices = item.get('choices', [])
+        answer = item.get('answer')
+        points = item.get('points', 1)
+        if qid in seen:
+            raise serializers.ValidationError(f'Duplicate question id {qid}.')
+        if kind not in QUESTION_TYPES:
+            raise serializers.ValidationError(f'Question {qid}: type must be one of {", ".join(QUESTION_TYPES)}.')
+        if not isinstance(points, (int, float)) or isinstance(points, bool) or points < 0:
+            raise serializers.ValidationError(f'Question {qid}: points must be a non-negative number.')
+        if kind == SINGLE:
+            if not _is_index(answer, choices):
+                raise serializers.ValidationError(f'Question {qid}: answer must be a choice index.')
+        elif kind == MULTIPLE:
+            if not isinstance(answer, list) or not all(_is_index(a, choices) for a in answer):
+                raise serializers.ValidationError(f'Question {qid}: answer must be a list of choice indexes.')
+            answer = sorted(set(answer))
+        else:
+            answer = [answer] if isinstance(answer, str) else answer
+            if not isinstance(answer, list) or not answer or not all(isinstance(a, str) for a in answer):
+                raise serializers.ValidationError(f'Question {qid}: answer must be one or more accepted strings.')
+        seen.add(qid)
+        questions.append({'id': qid, 'type': kind, 'prompt': item.get('prompt', ''), 'choices': choices,
+                          'answer': answer, 'points': points})
+    return {'questions': questions}
+
+
+class AnswerKey:
+    """A quiz compiled for scoring: one (id, type, expected, points) tuple per question."""
+    __slots__ = ('version', 'entries', 'total')
+
+    def __init__(self, version, questions):
+        self.version = version
+        self.entries = []
+        for q in normalize_questions(questions)['questions']:
+            if q['type'] == SINGLE: expected = q['answer']
+            elif q['type'] == MULTIPLE: expected = frozenset(q['answer'])
+            else: expected = frozenset(_fold(a) for a in q['answer'])
+            self.entries.append((q['id'], q['type'], expected, q['points']))
+        self.entries = tuple(self.entries)
+        self.total = sum(entry[3] for entry in self.entries)
+
+    def score(self, answers):
+        """Return (percentage score, {question id: correct}) for a dict of answers."""
+        earned, marks = 0, {}
+        for qid, kind, expected, points in self.entries:
+            given = answers.get(qid)
+            try:
+                if given is None: correct = False
+                elif kind == SINGLE: correct = given == expected
+                elif kind == MULTIPLE: correct = frozenset(given) == expected
+                else: correct = _fold(given) in expected
+            except TypeError:
+                correct = False
+            marks[qid] = correct
+            if correct: earned += points
+        return (round(earned / self.total * 100, 2) if self.total else 0.0), marks
+
+
+_keys = OrderedDict()
+_keys_lock = threading.Lock()
+MAX_KEYS = 1024
+
+
+def get_answer_key(quiz_id, version):
+    """Compiled answer key for a quiz version, built once per process and kept in an LRU."""
+    with _keys_lock:
+        key = _keys.get(quiz_id)
+        if key is not None and key.version == version:
+            _keys.move_to_end(quiz_id)
+            return key
+    version, questions = Quiz.objects.filter(pk=quiz_id).values_list('version', 'questions').get()
+    key = AnswerKey(version, questions)
+    with _keys_lock:
+        _keys[quiz_id] = key
+        _keys.move_to_end(quiz_id)
+        while len(_keys) > MAX_KEYS:
+            _keys.popitem(last=False)
+    return key
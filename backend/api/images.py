@@ -0,0 +1,102 @@
+import io
+import os
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Widths generated per image field. Originals narrower than a width are not upscaled.
+WIDTHS = {
+    'thumbnail': (320, 640),
+    'profile_picture': (64, 256),
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def variant_name(source, width, extension):
+    """
+    Derivatives sit next to the original: thumbnails/a.png -> thumbnails/derived/a.png_320.webp.
+    The whole file name is kept because stored originals are unique by name, their stems are not.
+    """
+    folder, filename = os.path.split(source)
+    return f'{folder}/derived/{filename}_{width}.{extension}'
+
+
+def variant_files(variants):
+    return {name for names in (variants or {}).get('sizes', {}).values() for name in names.values()}
+
+
+def delete_files(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def render(image, width, extension):
+    if image.width > width:
+        image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+    if extension == 'jpeg' and image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    buffer = io.BytesIO()
+    pil_format, options = FORMATS[extension]
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def build_variants(source, widths):
+    """
+    Resize and recompress one stored image. Returns the variants map saved on
+    the model: {"source": name, "sizes": {"320": {"webp": name, "jpeg": name}}}.
+    """
+    variants = {'source': source, 'sizes': {}}
+    try:
+        with default_storage.open(source, 'rb') as handle:
+            image = Image.open(handle)
+            # Let the JPEG decoder downscale while reading; far cheaper for camera-sized originals
+            image.draft('RGB', (max(widths), max(widths)))
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (OSError, Image.DecompressionBombError):
+        return variants  # not an image we can read; keep serving the original
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    previous = None
+    for width in sorted(widths):
+        width = min(width, image.width)
+        if width == previous: break
+        previous = width
+        names = {}
+        for extension in FORMATS:
+            # Never overwrite: if the name is taken, storage picks a free one and the map records it
+            names[extension] = default_storage.save(variant_name(source, width, extension), ContentFile(render(image, width, extension)))
+        variants['sizes'][str(width)] = names
+    return variants
+
+
+def refresh_variants(model_label, pk, field):
+    """
+    Rebuild the derivatives of one image field. Only files listed in this
+    record's own variants map are ever deleted.
+    """
+    model = apps.get_model(model_label)
+    row = model.objects.filter(pk=pk).values(field, f'{field}_variants').first()
+    if not row or not row[field]: return None
+    source, previous = row[field], row[f'{field}_variants']
+    variants = build_variants(source, WIDTHS[field])
+    # Only record them if the original was not replaced while we worked; otherwise they are nobody's
+    if model.objects.filter(pk=pk, **{field: source}).update(**{f'{field}_variants': variants}):
+        delete_files(variant_files(previous) - variant_files(variants))
+    else:
+        delete_files(variant_files(variants))
+    return variants
+
+
+def needs_variants(instance, field):
+    image = getattr(instance, field)
+    return bool(image) and getattr(instance, f'{field}_variants', {}).get('source') != image.name
@@ -0,0 +1,58 @@
+import secrets
+
+from django.db import IntegrityError
+
+from .models import Lesson, Enrollment, LessonCompletion, Certificate, Comment, SearchDocument
+from .tasks import task, enqueue
+from .cache import bump_content_version
+from . import analytics, images, search, uploads
+
+
+@task(max_retries=5, retry_delay=10)
+def evaluate_course_completion(student_id, lesson_id):
+    course_id = Lesson.objects.filter(pk=lesson_id).values_list('module__course_id', flat=True).first()
+    if course_id is None: return
+    enrollment = Enrollment.objects.select_related('course').filter(student_id=student_id, course_id=course_id).first()
+    if enrollment is not None:
+        total, done = enrollment.course.lesson_count, enrollment.completed_lessons
+    else:
+        total = Lesson.objects.filter(module__course_id=course_id).count()
+        done = LessonCompletion.objects.filter(student_id=student_id, lesson__module__course_id=course_id).count()
+    if total > 0 and done >= total:
+        enqueue(issue_certificate, key=f'certificate:{student_id}:{course_id}', student_id=student_id, course_id=course_id)
+
+
+@task(max_retries=5, retry_delay=10)
+def issue_certificate(student_id, course_id):
+    if Certificate.objects.filter(student_id=student_id, course_id=course_id).exists(): return
+    random_id = secrets.token_hex(4).upper() # 8 characters
+    try:
+        Certificate.objects.create(student_id=student_id, course_id=course_id, certificate_id=f"SLMS-{random_id}")
+    except IntegrityError:
+        # Either another worker issued it first (done) or the random id collided (retry).
+        if not Certificate.objects.filter(student_id=student_id, course_id=course_id).exists(): raise
+
+
+@task(max_retries=3, retry_delay=30)
+def refresh_grade_rollup(assignment_id):
+    analytics.refresh_assignment_grades(assignment_id)
+
+
+@task(max_retries=3, retry_delay=60)
+def build_image_variants(model, pk, field):
+    images.refresh_variants(model, pk, field)
+    if model == 'api.Course': bump_content_version(course_id=pk)
+
+
+@task(max_retries=3, retry_delay=30)
+def assemble_upload(upload_id):
+    # Hashing and copying up to UPLOAD_MAX_SIZE takes too long for a web worker
+    submission = uploads.finish(upload_id)
+    if submission is not None:
+        enqueue(refresh_grade_rollup, key=f'grade-rollup:{submission.assignment_id}', assignment_id=submission.assignment_id)
+
+
+@task(max_retries=3, retry_delay=30)
+def reindex_lesson_comments(lesson_id):
+    # Comment documents carry the lesson title and course, so they follow lesson edits
+    search.index(SearchDocument.COMMENT, Comment.objects.filter(lesson_id=lesson_id).values_list('id', flat=True))
@@ -0,0 +1,70 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarking import measure, load_baseline, save_baseline, regressions
+from api.models import Course, Lesson, Enrollment
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the main API endpoints (run seed_data first) and compare against a stored baseline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--only', nargs='*', help='Scenario names to run.')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline.')
+        parser.add_argument('--threshold', type=float, default=0.25, help='Allowed relative p95/bytes growth.')
+
+    def scenarios(self):
+        enrollment = Enrollment.objects.select_related('student').order_by('-completed_lessons', 'id').first()
+        if enrollment is None:
+            raise CommandError('No enrollments found; run `manage.py seed_data` first.')
+        student = enrollment.student
+        course = Course.objects.order_by('-lesson_count', 'id').first()
+        lesson = Lesson.objects.order_by('-comment_count', 'id').first()
+        return {
+            'courses-list': ('/api/courses/', None),
+            'courses-catalog': ('/api/courses/catalog/', None),
+            'course-detail': (f'/api/courses/{course.pk}/', None),
+            'enrollments': ('/api/enrollments/', student),
+            'lesson-completions': ('/api/lesson-completions/', student),
+            'certificates': ('/api/certificates/', student),
+            'users-me': ('/api/users/me/', student),
+            'lesson-detail': (f'/api/lessons/{lesson.pk}/?comments=5', student),
+            'lesson-thread': (f'/api/lessons/{lesson.pk}/comments/', student),
+        }
+
+    def handle(self, *args, **options):
+        scenarios = self.scenarios()
+        names = options['only'] or list(scenarios)
+        unknown = set(names) - set(scenarios)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        results = {}
+        self.stdout.write(f"{'scenario':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'bytes':>10}")
+        for name in names:
+            url, user = scenarios[name]
+            results[name] = row = measure(url, user, options['iterations'], options['warmup'])
+            self.stdout.write(
+                f"{name:<20}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['queries']:>9}{row['bytes']:>10}"
+            )
+
+        if options['save_baseline']:
+            save_baseline(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+            return
+
+        baseline = load_baseline(options['baseline'])
+        if baseline is None:
+            self.stdout.write(f"No baseline at {options['baseline']}; rerun with --save-baseline to store one.")
+            return
+        found = regressions(results, baseline, options['threshold'])
+        if found:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(found))
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarking import auth_headers, load_test, load_baseline, save_baseline
+from api.models import User, Lesson, Enrollment
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test a running deployment on the read-heavy endpoints at increasing concurrency. '
+        'Run it against the WSGI and the ASGI deployment (same database) and compare with --compare.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000', help='Base URL of the running server.')
+        parser.add_argument('--concurrency', default='10,50,100,200', help='Comma separated client counts.')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per concurrency level.')
+        parser.add_argument('--save', help='Write the results as JSON to this file.')
+        parser.add_argument('--compare', help='Results file of another deployment to compare against.')
+
+    def handle(self, *args, **options):
+        enrollment = Enrollment.objects.select_related('student').order_by('id').first()
+        lesson = Lesson.objects.filter(module__course_id=enrollment.course_id).first() if enrollment else None
+        if lesson is None:
+            raise CommandError('No enrollments found; run `manage.py seed_data` first.')
+        headers = {'Authorization': auth_headers(enrollment.student)['HTTP_AUTHORIZATION']}
+        paths = ['/api/courses/catalog/', f'/api/lessons/{lesson.pk}/', '/api/users/me/', '/api/certificates/']
+
+        previous = {row['concurrency']: row for row in load_baseline(options['compare']) or []} if options['compare'] else {}
+        results = []
+        self.stdout.write(f"{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'vs other':>10}")
+        for level in [int(n) for n in options['concurrency'].split(',')]:
+            row = load_test(options['url'], paths, headers, level, options['duration'])
+            results.append(row)
+            other = previous.get(level)
+            ratio = f"{row['rps'] / other['rps']:.2f}x" if other and other['rps'] else '-'
+            self.stdout.write(
+                f"{level:>8}{row['rps']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['errors']:>8}{ratio:>10}"
+            )
+
+        if options['save']:
+            save_baseline(options['save'], results)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['save']}"))
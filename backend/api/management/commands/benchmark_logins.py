@@ -0,0 +1,59 @@
+import os
+import threading
+import time
+
+from django.contrib.auth.hashers import get_hashers, make_password
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure password verifications (logins) per second for each configured hasher at its current cost, '
+        'with several concurrent callers (like that many web workers on this host). Use it to pick PASSWORD_HASHER, '
+        'its cost settings and the worker count.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hashers', nargs='*', help='Hasher algorithms to measure (default: all configured).')
+        parser.add_argument('--concurrency', default='1,4,16', help='Comma separated caller counts.')
+        parser.add_argument('--duration', type=float, default=5, help='Seconds per hasher and concurrency level.')
+
+    def measure(self, hasher, encoded, callers, duration):
+        done = [0] * callers
+        deadline = time.perf_counter() + duration
+
+        def login(slot):
+            while time.perf_counter() < deadline:
+                hasher.verify('benchmark-password', encoded)
+                done[slot] += 1
+
+        threads = [threading.Thread(target=login, args=(slot,)) for slot in range(callers)]
+        started = time.perf_counter()
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        return sum(done), time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        hashers = {hasher.algorithm: hasher for hasher in get_hashers()}
+        names = options['hashers'] or list(hashers)
+        unknown = set(names) - set(hashers)
+        if unknown:
+            raise CommandError(f"Unknown hashers: {', '.join(sorted(unknown))}")
+
+        cores = os.cpu_count() or 1
+        self.stdout.write(f'{cores} cores')
+        self.stdout.write(f"{'hasher':<24}{'callers':>8}{'logins/s':>10}{'per core':>10}{'ms each':>10}")
+        for name in names:
+            hasher = hashers[name]
+            try:
+                encoded = make_password('benchmark-password', hasher=hasher)
+            except ValueError as error:  # the hasher's library is not installed
+                self.stdout.write(f'{name:<24}skipped: {error}')
+                continue
+            for callers in [int(n) for n in options['concurrency'].split(',')]:
+                count, elapsed = self.measure(hasher, encoded, callers, options['duration'])
+                rate = count / elapsed
+                self.stdout.write(
+                    f"{name:<24}{callers:>8}{rate:>10.1f}{rate / min(cores, callers):>10.1f}"
+                    f"{elapsed * callers * 1000 / max(count, 1):>10.1f}"
+                )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import bump_content_version
+from api.images import needs_variants, refresh_variants
+from api.models import User, Course
+
+
+class Command(BaseCommand):
+    help = 'Build resized thumbnail and profile picture derivatives for images uploaded before the pipeline existed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that are already up to date.')
+
+    def handle(self, *args, **options):
+        built = 0
+        for model, field in ((Course, 'thumbnail'), (User, 'profile_picture')):
+            queryset = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).only('pk', field, f'{field}_variants')
+            for instance in queryset.iterator():
+                if options['force'] or needs_variants(instance, field):
+                    refresh_variants(model._meta.label, instance.pk, field)
+                    if model is Course: bump_content_version(course_id=instance.pk)
+                    built += 1
+        self.stdout.write(self.style.SUCCESS(f'Built derivatives for {built} images.'))
@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from smartlms.db import REPLICA, PIN_COOKIE
+
+
+class Command(BaseCommand):
+    help = (
+        'Check read-replica routing end to end: safe requests read from the replica, a write request goes to '
+        'the primary and pins the client there. Locally, point DB_REPLICA_NAME at a copy of the SQLite file.'
+    )
+
+    def request(self, client, method, url, **kwargs):
+        with CaptureQueriesContext(connections['default']) as primary, CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = getattr(client, method)(url, **kwargs)
+        return response, len(primary.captured_queries), len(replica.captured_queries)
+
+    def handle(self, *args, **options):
+        if REPLICA not in settings.DATABASES:
+            raise CommandError('No replica configured; set DB_REPLICA_HOST or DB_REPLICA_NAME.')
+        failures = []
+
+        def expect(label, response, primary, replica, want):
+            where = 'replica' if replica and not primary else 'primary' if primary and not replica else 'both'
+            self.stdout.write(f'{label:<42} {response.status_code}  primary={primary} replica={replica}')
+            if where != want: failures.append(f'{label}: expected {want}, queries went to {where}')
+
+        client = Client()
+        expect('GET catalog', *self.request(client, 'get', '/api/courses/catalog/'), 'replica')
+
+        # The write is rolled back so the check leaves no trace
+        with transaction.atomic():
+            username = f'routing-check-{int(time.time())}'
+            response, primary, replica = self.request(client, 'post', '/api/users/', data={
+                'username': username, 'password': 'routing-check-pw', 'email': f'{username}@example.com',
+            }, content_type='application/json')
+            expect('POST users (write)', response, primary, replica, 'primary')
+            if PIN_COOKIE not in response.cookies:
+                failures.append('POST did not pin the client to the primary')
+            response, primary, replica = self.request(client, 'get', '/api/courses/catalog/')
+            expect('GET catalog right after the write', response, primary, replica, 'primary')
+            transaction.set_rollback(True)
+
+        client.cookies.pop(PIN_COOKIE, None)
+        expect('GET catalog once the pin expired', *self.request(client, 'get', '/api/courses/catalog/'), 'replica')
+
+        if failures:
+            raise CommandError('Replica routing is broken:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Reads go to the replica and writes pin the client to the primary.'))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from api.models import User, Course, Module, Lesson, Announcement, Comment
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Assert that the course endpoints issue a constant number of queries regardless of catalog size.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[2, 20])
+
+    def seed(self, instructor, count):
+        for i in range(count):
+            course = Course.objects.create(title=f'Course {i}', description='-', instructor=instructor)
+            Announcement.objects.create(course=course, title='Welcome', content='-')
+            for m in range(2):
+                module = Module.objects.create(course=course, title=f'Module {m}', order=m)
+                for l in range(2):
+                    lesson = Lesson.objects.create(module=module, title=f'Lesson {l}', content='-', order=l)
+                    Comment.objects.create(lesson=lesson, user=instructor, text='-')
+        return course
+
+    def measure(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = Client().get(url)
+        if response.status_code != 200:
+            raise CommandError(f'GET {url} returned {response.status_code}')
+        return len(ctx.captured_queries)
+
+    def handle(self, *args, **options):
+        results = {}
+        try:
+            with transaction.atomic():
+                instructor = User.objects.create(username='query-count-instructor')
+                seeded = 0
+                for size in sorted(set(options['sizes'])):
+                    last = self.seed(instructor, size - seeded)
+                    seeded = size
+                    results[size] = (self.measure('/api/courses/'), self.measure(f'/api/courses/{last.pk}/'))
+                    self.stdout.write(f'{size} courses: list={results[size][0]} retrieve={results[size][1]} queries')
+                raise Rollback
+        except Rollback:
+            pass
+
+        if len(set(results.values())) > 1:
+            raise CommandError('Query count grows with catalog size: %s' % results)
+        self.stdout.write(self.style.SUCCESS('Query counts are constant.'))
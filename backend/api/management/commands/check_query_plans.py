@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from api.models import (
+    Course, Module, Lesson, Enrollment, Submission, Result, LessonCompletion,
+    Announcement, Comment, Certificate, Task,
+)
+
+
+def hot_queries():
+    """The filters the views and serializers issue on every request, with placeholder ids."""
+    return {
+        'course catalog page': Course.objects.order_by('-created_at', '-id')[:51],
+        'modules of course': Module.objects.filter(course_id__in=[1, 2]),
+        'lessons of modules': Lesson.objects.filter(module_id__in=[1, 2]),
+        'comments of lessons': Comment.objects.filter(lesson_id__in=[1, 2]),
+        'announcements of course': Announcement.objects.filter(course_id__in=[1, 2]),
+        'student enrollments page': Enrollment.objects.filter(student_id=1).order_by('-enrolled_at', '-id')[:51],
+        'enrollment lookup': Enrollment.objects.filter(student_id=1, course_id=1),
+        'student completions page': LessonCompletion.objects.filter(student_id=1).order_by('-completed_at', '-id')[:51],
+        'completions in course': LessonCompletion.objects.filter(student_id=1, lesson__module__course_id=1).values('id'),
+        'submissions for grading': Submission.objects.filter(assignment_id=1, student_id__in=[1, 2]),
+        'results of student': Result.objects.filter(quiz_id=1, student_id=1),
+        'student certificates page': Certificate.objects.filter(student_id=1).order_by('-issued_at', '-id')[:51],
+        'task queue claim': Task.objects.filter(status=Task.QUEUED, run_after__lte=timezone.now()).order_by('run_after', 'id')[:100],
+    }
+
+
+def full_scans(queryset):
+    """Return (plan lines, tables read by a full table scan) for the queryset on the current backend."""
+    sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            lines = [row[3] for row in cursor.fetchall()]
+            # "SCAN t USING INDEX i" walks an index in order; a bare "SCAN t" reads every row
+            return lines, [line.split()[1] for line in lines if line.startswith('SCAN ') and ' USING ' not in line]
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN ' + sql, params)
+            columns = [col[0] for col in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            lines = [f"{r['table']}: type={r['type']} key={r['key']} rows={r['rows']}" for r in rows]
+            return lines, [r['table'] for r in rows if r['type'] == 'ALL']
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN ' + sql, params)
+            lines = [row[0] for row in cursor.fetchall()]
+            return lines, [line.split('Seq Scan on ')[1].split()[0] for line in lines if 'Seq Scan on ' in line]
+    raise CommandError(f'No query plan support for {connection.vendor}')
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot queries and fail if any of them falls back to a full table scan.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--allow', nargs='*', default=[], help='Tables that may be scanned (e.g. tiny lookup tables).')
+
+    def handle(self, *args, **options):
+        failures = []
+        for label, queryset in hot_queries().items():
+            lines, scanned = full_scans(queryset)
+            scanned = [table for table in scanned if table not in options['allow']]
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{label}:\n  ' + '\n  '.join(lines))
+            if scanned:
+                failures.append(f"{label}: full scan of {', '.join(scanned)}")
+
+        if failures:
+            raise CommandError('Hot queries without a usable index:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS(f'{len(hot_queries())} hot queries use indexes.'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import exports
+from api.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Stream a course export (submissions, results or progress) to a file or stdout in constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course', type=int)
+        parser.add_argument('dataset', choices=sorted(exports.DATASETS))
+        parser.add_argument('--output', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--file', help='Destination path; defaults to stdout.')
+
+    def handle(self, *args, **options):
+        if not Course.objects.filter(pk=options['course']).exists():
+            raise CommandError(f"Course {options['course']} does not exist.")
+        chunks = exports.stream(options['dataset'], options['course'], options['output'])
+        if options['file']:
+            with open(options['file'], 'w', newline='') as fh:
+                fh.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,48 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Course
+from api.roster import import_roster
+
+COLUMNS = {'username', 'email', 'first_name', 'last_name', 'role', 'password'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Enroll a CSV roster in a course. Columns (header row required): username and/or email, optionally '
+        'first_name, last_name, role and password. Unknown students are skipped unless --create-missing is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--course', type=int, help='Course id to enroll everyone in; omit to only create accounts.')
+        parser.add_argument('--create-missing', action='store_true', help='Create accounts for unknown students.')
+        parser.add_argument('--password', help='Initial password for created accounts without a password column (default: unusable until reset).')
+
+    def handle(self, *args, **options):
+        if options['course'] and not Course.objects.filter(pk=options['course']).exists():
+            raise CommandError(f"Course {options['course']} does not exist.")
+        started = time.perf_counter()
+        with open(options['csv_path'], newline='', encoding='utf-8-sig') as handle:
+            reader = csv.DictReader(handle)
+            if not reader.fieldnames or not {'username', 'email'} & set(reader.fieldnames):
+                raise CommandError('The CSV needs a header row with a username or email column.')
+            rows = [{key: value.strip() for key, value in row.items() if key in COLUMNS and value} for row in reader]
+
+        summary = import_roster(rows, course_id=options['course'], create_missing=options['create_missing'],
+                                password=options['password'])
+        for row in summary['not_found'][:20]:
+            self.stderr.write(f"No such user: {row.get('username') or row.get('email')}")
+        if len(summary['not_found']) > 20:
+            self.stderr.write(f"... and {len(summary['not_found']) - 20} more")
+        for row in summary['conflicts'][:20]:
+            self.stderr.write(f"Username {row.get('username') or row.get('email')} belongs to another account; not created")
+        if len(summary['conflicts']) > 20:
+            self.stderr.write(f"... and {len(summary['conflicts']) - 20} more")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(rows)} rows: {summary['users_created']} accounts created, {summary['enrolled']} enrolled, "
+            f"{summary['already_enrolled']} already enrolled, {len(summary['not_found'])} not found, "
+            f"{len(summary['conflicts'])} username conflicts ({time.perf_counter() - started:.1f}s)."
+        ))
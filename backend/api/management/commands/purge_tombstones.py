@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete delta-sync tombstones older than SYNC_TOMBSTONE_DAYS; clients with older cursors resync in full.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Age after which a tombstone is dropped (default SYNC_TOMBSTONE_DAYS).')
+
+    def handle(self, *args, **options):
+        purged = purge_tombstones(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} tombstones.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.uploads import purge_stale
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked upload sessions that were never completed, along with their parts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, help='Age after which a session is stale (default UPLOAD_SESSION_HOURS).')
+
+    def handle(self, *args, **options):
+        purged = purge_stale(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} stale upload sessions.'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.counters import recount_courses, recount_enrollments, recount_lessons
+from api.models import Course, Lesson, Enrollment
+
+
+class Command(BaseCommand):
+    help = 'Recompute Course.lesson_count and module_count, Lesson.comment_count and Enrollment.completed_lessons from the source tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, nargs='*', help='Only rebuild these course ids.')
+
+    def handle(self, *args, **options):
+        courses, lessons, enrollments = Course.objects.all(), Lesson.objects.all(), Enrollment.objects.all()
+        if options['course']:
+            courses = courses.filter(pk__in=options['course'])
+            lessons = lessons.filter(module__course_id__in=options['course'])
+            enrollments = enrollments.filter(course_id__in=options['course'])
+        with transaction.atomic():
+            course_rows = recount_courses(courses)
+            lesson_rows = recount_lessons(lessons)
+            enrollment_rows = recount_enrollments(enrollments)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {course_rows} courses, {lesson_rows} lessons and {enrollment_rows} enrollments.'))
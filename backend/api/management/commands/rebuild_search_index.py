@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from every course, lesson and comment. Signals keep it current afterwards.'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = search.rebuild()
+        summary = ', '.join(f'{count} {kind}s' for kind, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {summary} with the {search.backend()} backend in {time.perf_counter() - started:.1f}s.'
+        ))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.tasks import DatabaseBackend
+
+PURGE_EVERY = 3600  # seconds
+
+
+class Command(BaseCommand):
+    help = 'Drain the database task queue (TASK_BACKEND=db), deleting rows finished more than TASK_KEEP_DAYS ago.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=100)
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Process what is due now and exit.')
+
+    def handle(self, *args, **options):
+        backend = DatabaseBackend()
+        purged_at = 0
+        while True:
+            if time.monotonic() - purged_at > PURGE_EVERY:
+                purged = backend.purge()
+                if purged: self.stdout.write(f'Purged {purged} finished tasks.')
+                purged_at = time.monotonic()
+            processed = backend.run_pending(options['batch'])
+            if options['once'] and not processed: break
+            if not processed: time.sleep(options['sleep'])
@@ -0,0 +1,123 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.counters import recount_courses, recount_enrollments, recount_lessons
+from api.models import (
+    Role, User, Course, Module, Lesson, Enrollment, Assignment, Submission,
+    Quiz, Result, LessonCompletion, Announcement, Comment,
+)
+
+BATCH = 5000
+
+
+def bulk_insert(model, objects):
+    """bulk_create in batches and return the new primary keys (MySQL does not report them back)."""
+    if not objects: return []
+    model.objects.bulk_create(objects, batch_size=BATCH)
+    if objects[0].pk is not None:
+        return [obj.pk for obj in objects]
+    return list(model.objects.order_by('-pk').values_list('pk', flat=True)[:len(objects)])[::-1]
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic dataset for benchmarks. Rows are inserted in bulk; counters are rebuilt at the end.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=200)
+        parser.add_argument('--instructors', type=int, default=20)
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--modules', type=int, default=5, help='Modules per course.')
+        parser.add_argument('--lessons', type=int, default=6, help='Lessons per module.')
+        parser.add_argument('--enrollments', type=int, default=5, help='Courses per student.')
+        parser.add_argument('--completion-rate', type=float, default=0.4, help='Share of lessons each enrolled student completed.')
+        parser.add_argument('--comments', type=int, default=2, help='Comments per lesson.')
+        parser.add_argument('--password', default='benchmark', help='Password set on every seeded user.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def log(self, message):
+        self.stdout.write(f'[{time.perf_counter() - self.started:7.1f}s] {message}')
+
+    def handle(self, *args, **o):
+        rng = random.Random(o['seed'])
+        self.started = time.perf_counter()
+        tag = f"seed{int(time.time())}"
+        password = make_password(o['password'])  # hashed once, shared by every seeded user
+        now = timezone.now()
+
+        with transaction.atomic():
+            student_role, _ = Role.objects.get_or_create(name='Student')
+            instructor_role, _ = Role.objects.get_or_create(name='Instructor')
+            instructors = bulk_insert(User, [
+                User(username=f'{tag}_teacher{i}', password=password, role=instructor_role) for i in range(o['instructors'])
+            ])
+            students = bulk_insert(User, [
+                User(username=f'{tag}_student{i}', password=password, role=student_role) for i in range(o['students'])
+            ])
+            self.log(f'{len(instructors)} instructors, {len(students)} students')
+
+            categories = [value for value, _ in Course.CATEGORIES]
+            courses = bulk_insert(Course, [
+                Course(title=f'Course {i}', description=f'Synthetic course {i} ' * 5, category=rng.choice(categories),
+                       instructor_id=rng.choice(instructors))
+                for i in range(o['courses'])
+            ])
+            modules = bulk_insert(Module, [
+                Module(course_id=course, title=f'Module {m}', order=m) for course in courses for m in range(o['modules'])
+            ])
+            lessons = bulk_insert(Lesson, [
+                Lesson(module_id=module, title=f'Lesson {n}', content='Lorem ipsum dolor sit amet. ' * 40, order=n)
+                for module in modules for n in range(o['lessons'])
+            ])
+            bulk_insert(Announcement, [Announcement(course_id=course, title='Welcome', content='Hello!') for course in courses])
+            assignments = bulk_insert(Assignment, [
+                Assignment(module_id=module, title='Homework', description='-', due_date=now) for module in modules[::o['modules']]
+            ])
+            quizzes = bulk_insert(Quiz, [
+                Quiz(module_id=module, title='Quiz', questions={'questions': []}) for module in modules[::o['modules']]
+            ])
+            self.log(f'{len(courses)} courses, {len(modules)} modules, {len(lessons)} lessons')
+
+            bulk_insert(Comment, [
+                Comment(lesson_id=lesson, user_id=rng.choice(students), text='Great lesson!')
+                for lesson in lessons for _ in range(o['comments'])
+            ])
+
+            per_course = o['modules'] * o['lessons']
+            enrollments, completions, completed = [], [], 0
+            for student in students:
+                for index in rng.sample(range(len(courses)), min(o['enrollments'], len(courses))):
+                    enrollments.append(Enrollment(student_id=student, course_id=courses[index]))
+                    course_lessons = lessons[index * per_course:(index + 1) * per_course]
+                    done = rng.sample(course_lessons, int(len(course_lessons) * o['completion_rate']))
+                    completions.extend(LessonCompletion(student_id=student, lesson_id=lesson) for lesson in done)
+                # Flush in batches so memory stays flat at millions of rows
+                if len(completions) >= BATCH or len(enrollments) >= BATCH:
+                    Enrollment.objects.bulk_create(enrollments, batch_size=BATCH)
+                    LessonCompletion.objects.bulk_create(completions, batch_size=BATCH)
+                    completed += len(completions)
+                    enrollments, completions = [], []
+            Enrollment.objects.bulk_create(enrollments, batch_size=BATCH)
+            LessonCompletion.objects.bulk_create(completions, batch_size=BATCH)
+            completed += len(completions)
+            self.log(f'{len(students) * o["enrollments"]} enrollments, {completed} lesson completions')
+
+            bulk_insert(Submission, [
+                Submission(assignment_id=rng.choice(assignments), student_id=student, file='submissions/seed.txt')
+                for student in students
+            ])
+            bulk_insert(Result, [
+                Result(quiz_id=rng.choice(quizzes), student_id=student, score=rng.randint(0, 100)) for student in students
+            ])
+
+            seeded = (min(courses), max(courses))
+            recount_courses(Course.objects.filter(pk__range=seeded))
+            recount_lessons(Lesson.objects.filter(module__course__pk__range=seeded))
+            recount_enrollments(Enrollment.objects.filter(course__pk__range=seeded))
+            self.log('progress counters rebuilt')
+
+        self.stdout.write(self.style.SUCCESS(f"Seeded dataset '{tag}'. Users log in with password '{o['password']}'."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from api import analytics
+
+
+class Command(BaseCommand):
+    help = 'Fold new enrollments, lesson completions and quiz results into the analytics rollups. Run it from cron.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--settle', type=int, default=30, help='Skip rows younger than this many seconds.')
+        parser.add_argument('--rebuild', action='store_true', help='Drop the rollups and rebuild them from scratch.')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            processed = analytics.rebuild(options['settle'])
+        else:
+            processed = analytics.process_new_rows(options['settle'])
+        summary = ', '.join(f'{name}: {count} ids' for name, count in processed.items())
+        self.stdout.write(self.style.SUCCESS(f'Analytics updated ({summary}).'))
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:43
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Course = apps.get_model('api', 'Course')
+    Lesson = apps.get_model('api', 'Lesson')
+    Enrollment = apps.get_model('api', 'Enrollment')
+    LessonCompletion = apps.get_model('api', 'LessonCompletion')
+
+    lessons = (Lesson.objects.filter(module__course=OuterRef('pk')).order_by()
+               .values('module__course').annotate(n=Count('id')).values('n'))
+    Course.objects.update(lesson_count=Coalesce(Subquery(lessons), 0))
+
+    done = (LessonCompletion.objects.filter(student=OuterRef('student'), lesson__module__course=OuterRef('course')).order_by()
+            .values('student').annotate(n=Count('id')).values('n'))
+    Enrollment.objects.update(completed_lessons=Coalesce(Subquery(done), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_lessons',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_count(apps, schema_editor):
+    Lesson = apps.get_model('api', 'Lesson')
+    Comment = apps.get_model('api', 'Comment')
+    comments = Comment.objects.filter(lesson=OuterRef('pk')).order_by().values('lesson').annotate(n=Count('id')).values('n')
+    Lesson.objects.update(comment_count=Coalesce(Subquery(comments), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_delta_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_comment_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['lesson', 'created_at', 'id'], name='comments_lesson_thread_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comments_lesson_created_idx',
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:25
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def backfill_claimed_at(apps, schema_editor):
+    Task = apps.get_model('api', 'Task')
+    # Rows stuck in running get a lease that starts now; finished rows age from when they were due
+    Task.objects.filter(status='running').update(claimed_at=timezone.now())
+    Task.objects.filter(status__in=['done', 'failed']).update(claimed_at=F('run_after'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_lesson_comment_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_claimed_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'claimed_at'], name='tasks_status_claimed_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:31
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_module_count(apps, schema_editor):
+    Course = apps.get_model('api', 'Course')
+    Module = apps.get_model('api', 'Module')
+    modules = Module.objects.filter(course=OuterRef('pk')).order_by().values('course').annotate(n=Count('id')).values('n')
+    Course.objects.update(module_count=Coalesce(Subquery(modules), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_stream_tickets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='module_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_module_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def _count(queryset, group_by):
+    return Coalesce(Subquery(queryset.order_by().values(group_by).annotate(n=Count('id')).values('n')), 0)
+
+
+def recount_drifted(apps, schema_editor):
+    # Full saves of stale instances used to write old counter values back
+    Course = apps.get_model('api', 'Course')
+    Module = apps.get_model('api', 'Module')
+    Lesson = apps.get_model('api', 'Lesson')
+    Enrollment = apps.get_model('api', 'Enrollment')
+    LessonCompletion = apps.get_model('api', 'LessonCompletion')
+    Comment = apps.get_model('api', 'Comment')
+
+    lessons = _count(Lesson.objects.filter(module__course=OuterRef('pk')), 'module__course')
+    modules = _count(Module.objects.filter(course=OuterRef('pk')), 'course')
+    Course.objects.update(lesson_count=lessons, module_count=modules)
+
+    comments = _count(Comment.objects.filter(lesson=OuterRef('pk')), 'lesson')
+    Lesson.objects.update(comment_count=comments)
+
+    # Only drifted enrollments get a new updated_at, so delta-sync clients refetch just those
+    done = _count(LessonCompletion.objects.filter(
+        student=OuterRef('student'), lesson__module__course=OuterRef('course')), 'student')
+    Enrollment.objects.exclude(completed_lessons=done).update(completed_lessons=done, updated_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_course_module_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_drifted, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,26 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
+class InPlaceFieldsMixin:
+    """
+    Fields named in in_place_fields are only ever changed with
+    .update(F(...)) (see api.counters). A full save() of an instance loaded
+    before such an update would write the old value back, so save() leaves
+    them out unless the caller lists them in update_fields.
+    """
+    in_place_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            skipped = self.get_deferred_fields() | set(self.in_place_fields)
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped and field.name not in skipped
+            ]
+        super().save(*args, **kwargs)
+
 class Role(models.Model):
     name = models.CharField(max_length=50, unique=True)
     description = models.TextField(blank=True)
@@ -12,11 +32,30 @@ class User(AbstractUser):
     role = models.ForeignKey(Role, on_delete=models.SET_NULL, null=True, blank=True)
     bio = models.TextField(blank=True)
     profile_picture = models.ImageField(upload_to='profiles/', null=True, blank=True)
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)  # see api.images
+    token_version = models.PositiveIntegerField(default=0, editable=False)  # see api.authentication
 
     class Meta:
         db_table = 'users'
 
-class Course(models.Model):
+    @property
+    def display_name(self):
+        return self.get_full_name() or self.username
+
+    def set_password(self, raw_password):
+        super().set_password(raw_password)
+        # Tokens issued before a password change stop working
+        self.token_version += 1
+
+    def check_password(self, raw_password):
+        # Upgrading the stored hash on login is not a password change; keep the tokens valid
+        version = self.token_version
+        try:
+            return super().check_password(raw_password)
+        finally:
+            self.token_version = version
+
+class Course(InPlaceFieldsMixin, models.Model):
     CATEGORIES = [
         ('Programming', 'Programming'),
         ('Design', 'Design'),
@@ -29,10 +68,19 @@ class Course(models.Model):
     category = models.CharField(max_length=50, choices=CATEGORIES, default='Other')
     instructor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='courses_taught')
     thumbnail = models.ImageField(upload_to='thumbnails/', null=True, blank=True)
+    thumbnail_variants = models.JSONField(default=dict, blank=True, editable=False)  # see api.images
     created_at = models.DateTimeField(auto_now_add=True)
+    lesson_count = models.PositiveIntegerField(default=0, editable=False)
+    module_count = models.PositiveIntegerField(default=0, editable=False)
+    content_version = models.PositiveIntegerField(default=0, editable=False)
+
+    in_place_fields = ('lesson_count', 'module_count', 'content_version')
 
     class Meta:
         db_table = 'courses'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='courses_created_id_idx'),
+        ]
 
 class Module(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='modules')
@@ -41,25 +89,51 @@ class Module(models.Model):
 
     class Meta:
         db_table = 'modules'
+        ordering = ['order', 'id']
+        indexes = [
+            models.Index(fields=['course', 'order', 'id'], name='modules_course_order_idx'),
+        ]
 
-class Lesson(models.Model):
+class Lesson(InPlaceFieldsMixin, models.Model):
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='lessons')
     title = models.CharField(max_length=200)
     content = models.TextField()
     video_url = models.URLField(blank=True, null=True)
     order = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    in_place_fields = ('comment_count',)
 
     class Meta:
         db_table = 'lessons'
+        ordering = ['order', 'id']
+        indexes = [
+            models.Index(fields=['module', 'order', 'id'], name='lessons_module_order_idx'),
+        ]
 
-class Enrollment(models.Model):
+class Enrollment(InPlaceFieldsMixin, models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='enrollments')
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollments')
     enrolled_at = models.DateTimeField(auto_now_add=True)
+    completed_lessons = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    in_place_fields = ('completed_lessons',)
 
     class Meta:
         db_table = 'enrollments'
         unique_together = ('student', 'course')
+        indexes = [
+            models.Index(fields=['student', 'enrolled_at', 'id'], name='enroll_student_enrolled_idx'),
+            models.Index(fields=['updated_at', 'id'], name='enroll_updated_idx'),
+            models.Index(fields=['student', 'updated_at', 'id'], name='enroll_student_updated_idx'),
+        ]
+
+    @property
+    def progress_percentage(self):
+        total = self.course.lesson_count
+        if total == 0: return 0
+        return min(100, round((self.completed_lessons / total) * 100))
 
 class Assignment(models.Model):
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='assignments')
@@ -74,17 +148,23 @@ class Submission(models.Model):
     assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='submissions')
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='submissions')
     file = models.FileField(upload_to='submissions/')
+    checksum = models.CharField(max_length=64, blank=True, editable=False)  # sha256, set by chunked uploads
     submitted_at = models.DateTimeField(auto_now_add=True)
     grade = models.FloatField(null=True, blank=True)
     feedback = models.TextField(blank=True)
 
     class Meta:
         db_table = 'submissions'
+        indexes = [
+            models.Index(fields=['submitted_at', 'id'], name='subm_submitted_id_idx'),
+            models.Index(fields=['assignment', 'student', 'submitted_at'], name='subm_assign_student_idx'),
+        ]
 
 class Quiz(models.Model):
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='quizzes')
     title = models.CharField(max_length=200)
-    questions = models.JSONField(default=dict) # Simple JSON storage for q/a
+    questions = models.JSONField(default=dict) # Normalized by api.grading.normalize_questions
+    version = models.PositiveIntegerField(default=1, editable=False)
 
     class Meta:
         db_table = 'quizzes'
@@ -97,15 +177,24 @@ class Result(models.Model):
 
     class Meta:
         db_table = 'results'
+        indexes = [
+            models.Index(fields=['attempted_at', 'id'], name='results_attempted_id_idx'),
+            models.Index(fields=['quiz', 'student', 'attempted_at'], name='results_quiz_student_idx'),
+        ]
 
 class LessonCompletion(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lesson_completions')
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='completions')
     completed_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'lesson_completions'
         unique_together = ('student', 'lesson')
+        indexes = [
+            models.Index(fields=['student', 'completed_at', 'id'], name='lc_student_completed_idx'),
+            models.Index(fields=['student', 'updated_at', 'id'], name='lc_student_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.username} completed {self.lesson.title}"
@@ -115,18 +204,30 @@ class Announcement(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'announcements'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='announce_created_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='announce_updated_idx'),
+            models.Index(fields=['course', 'created_at'], name='announce_course_created_idx'),
+        ]
 
 class Comment(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='comments')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'comments'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='comments_created_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='comments_updated_idx'),
+            models.Index(fields=['lesson', 'created_at', 'id'], name='comments_lesson_thread_idx'),
+        ]
 
 class Certificate(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='certificates')
@@ -136,3 +237,158 @@ class Certificate(models.Model):
 
     class Meta:
         db_table = 'certificates'
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='cert_student_course_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['student', 'issued_at', 'id'], name='cert_student_issued_idx'),
+        ]
+
+class Task(models.Model):
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUSES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    key = models.CharField(max_length=200, blank=True, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField()
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)  # last claim by a worker; also when it finished
+
+    class Meta:
+        db_table = 'tasks'
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='tasks_status_run_after_idx'),
+            models.Index(fields=['status', 'claimed_at'], name='tasks_status_claimed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+class UploadSession(models.Model):
+    """A chunked submission upload in progress. Parts live on disk under MEDIA_ROOT/uploads/<id>/."""
+    RECEIVING, ASSEMBLING, DONE, FAILED = 'receiving', 'assembling', 'done', 'failed'
+    STATUSES = [(RECEIVING, 'Receiving'), (ASSEMBLING, 'Assembling'), (DONE, 'Done'), (FAILED, 'Failed')]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    checksum = models.CharField(max_length=64)  # sha256 of the whole file, hex
+    part_size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=RECEIVING)
+    error = models.CharField(max_length=255, blank=True)
+    submission = models.ForeignKey('Submission', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        db_table = 'upload_sessions'
+
+    @property
+    def parts(self):
+        return max(1, -(-self.size // self.part_size))
+
+class Tombstone(models.Model):
+    """
+    Marks a deleted enrollment, lesson completion, announcement or comment so
+    delta-sync clients (api.sync) learn about the delete. Written by signals,
+    pruned after SYNC_TOMBSTONE_DAYS.
+    """
+    kind = models.CharField(max_length=32)
+    object_id = models.BigIntegerField()
+    owner_id = models.BigIntegerField(null=True)  # the student the row belonged to, for private feeds
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'tombstones'
+        indexes = [
+            models.Index(fields=['kind', 'deleted_at', 'id'], name='tombstone_kind_deleted_idx'),
+            models.Index(fields=['kind', 'owner_id', 'deleted_at', 'id'], name='tombstone_owner_deleted_idx'),
+        ]
+
+class StreamTicket(models.Model):
+    """A single-use, short-lived credential for opening an event stream (see api.events)."""
+    key = models.CharField(max_length=64, primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'stream_tickets'
+
+# Search index, maintained by api.search. One row per course, lesson and comment;
+# the text index itself is MySQL FULLTEXT, SQLite FTS5 or SearchTerm rows.
+
+class SearchDocument(models.Model):
+    COURSE, LESSON, COMMENT = 'course', 'lesson', 'comment'
+    KINDS = [(COURSE, 'Course'), (LESSON, 'Lesson'), (COMMENT, 'Comment')]
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.BigIntegerField()
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='search_documents')
+    category = models.CharField(max_length=50)
+    title = models.CharField(max_length=200)
+    body = models.TextField()
+
+    class Meta:
+        db_table = 'search_documents'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_kind_object_uniq'),
+        ]
+
+class SearchTerm(models.Model):
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='terms')
+    term = models.CharField(max_length=64)
+    weight = models.FloatField()
+
+    class Meta:
+        db_table = 'search_terms'
+        indexes = [
+            models.Index(fields=['term', 'document'], name='search_term_doc_idx'),
+        ]
+
+# Analytics rollups, maintained by api.analytics. Dashboards read only these.
+
+class AnalyticsWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'analytics_watermarks'
+
+class CourseEnrollmentDaily(models.Model):
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollment_rollups')
+    date = models.DateField()
+    enrollments = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'analytics_course_enrollments'
+        unique_together = ('course', 'date')
+
+class LessonCompletionRollup(models.Model):
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='completion_rollups')
+    lesson = models.OneToOneField(Lesson, on_delete=models.CASCADE, related_name='completion_rollup')
+    completions = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'analytics_lesson_completions'
+
+class QuizScoreRollup(models.Model):
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='quiz_rollups')
+    quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, related_name='score_rollup')
+    attempts = models.IntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+
+    class Meta:
+        db_table = 'analytics_quiz_scores'
+
+class AssignmentGradeRollup(models.Model):
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='grade_rollups')
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='grade_rollups')
+    bucket = models.PositiveSmallIntegerField()  # 0 => 0-9, ..., 9 => 90-100
+    submissions = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'analytics_assignment_grades'
+        unique_together = ('assignment', 'bucket')
@@ -0,0 +1,104 @@
+import base64
+import json
+from datetime import date
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class TotalCountPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Project default. Pages by the view's `cursor_ordering` (a timestamp
+    followed by id) so deep pages cost the same as the first one.
+    Clients that need totals can pass ?page=N to get numbered pages
+    with a count instead.
+
+    Unlike DRF's CursorPagination, which filters on the first ordering field
+    and skips ties with an offset, the cursor holds the whole ordering tuple
+    of the boundary row and the next page is the rows strictly after it (as
+    api.sync._after does), so the composite (ts, id) indexes serve every page.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-id',)
+    delegate = None
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'cursor_ordering', self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if TotalCountPagination.page_query_param in request.query_params:
+            self.delegate = TotalCountPagination()
+            ordering = self.get_ordering(request, queryset, view)
+            return self.delegate.paginate_queryset(queryset.order_by(*ordering), request, view)
+        self.delegate = None
+        self.page_size = self.get_page_size(request)
+        if not self.page_size: return None
+        self.base_url = request.build_absolute_uri()
+        self.fields = [(name.lstrip('-'), name.startswith('-')) for name in self.get_ordering(request, queryset, view)]
+        position, self.reverse = self.decode_keyset(request, queryset.model)
+
+        # A previous-page cursor walks the ordering backwards from its row
+        order = [('-' if descending != self.reverse else '') + name for name, descending in self.fields]
+        queryset = queryset.order_by(*order)
+        if position is not None: queryset = queryset.filter(self.beyond(position))
+        rows = list(queryset[:self.page_size + 1])
+        more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if self.reverse: self.page.reverse()
+        self.has_next = True if self.reverse else more
+        self.has_previous = more if self.reverse else position is not None
+        return self.page
+
+    def beyond(self, position):
+        """Rows past `position` in walking order: (a, b) > (x, y) is a > x OR (a = x AND b > y)."""
+        condition, equal = Q(), {}
+        for (name, descending), value in zip(self.fields, position):
+            lookup = 'lt' if descending != self.reverse else 'gt'
+            term = Q(**equal, **{f'{name}__{lookup}': value})
+            condition = term if not condition else condition | term
+            equal[name] = value
+        return condition
+
+    def encode_keyset(self, row, reverse):
+        values = [getattr(row, name) for name, _ in self.fields]
+        raw = json.dumps({'p': values, 'r': reverse}, default=lambda value: value.isoformat() if isinstance(value, date) else str(value))
+        cursor = base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_keyset(self, request, model):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor: return None, False
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if len(raw['p']) != len(self.fields): raise ValueError
+            position = [model._meta.get_field(name).to_python(value) for (name, _), value in zip(self.fields, raw['p'])]
+            return position, bool(raw.get('r'))
+        except (ValueError, TypeError, KeyError, AttributeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page: return None
+        return self.encode_keyset(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page: return None
+        return self.encode_keyset(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if self.delegate: return self.delegate.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.delegate: return self.delegate.to_html()
+        return super().to_html()
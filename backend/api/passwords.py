@@ -0,0 +1,41 @@
+"""
+Password hashing. The hashers below read their cost from settings, so raising
+a cost (or switching PASSWORD_HASHER) upgrades each stored hash the next time
+its owner logs in. A login hashes on its own request thread, so login
+throughput per host is bounded by the number of web workers; bulk imports
+spread their hashing over PASSWORD_HASH_WORKERS threads, which run in
+parallel because the hash functions release the GIL.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+def hash_many(passwords):
+    """make_password() for a list of passwords, spread across a short-lived thread pool (for bulk imports)."""
+    if len(passwords) < 2: return [hashers.make_password(password) for password in passwords]
+    with ThreadPoolExecutor(min(settings.PASSWORD_HASH_WORKERS, len(passwords)), thread_name_prefix='password-hash') as pool:
+        return list(pool.map(hashers.make_password, passwords, chunksize=16))
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    work_factor = settings.SCRYPT_WORK_FACTOR
+    block_size = settings.SCRYPT_BLOCK_SIZE
+    parallelism = settings.SCRYPT_PARALLELISM
+
+    def must_update(self, encoded):
+        # Django's scrypt hasher never asks for an upgrade; do it when the cost settings change
+        decoded = self.decode(encoded)
+        return (decoded['work_factor'], decoded['block_size'], decoded['parallelism']) != (
+            self.work_factor, self.block_size, self.parallelism) or super().must_update(encoded)
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    iterations = settings.PBKDF2_ITERATIONS
@@ -0,0 +1,42 @@
+from rest_framework import serializers
+
+
+def _relation_path(source, prefix):
+    return prefix + source.replace('.', '__')
+
+
+def get_prefetch_plan(serializer, prefix=''):
+    """
+    Walk a serializer's fields and return (select_related, prefetch_related)
+    lookups covering every relation the serializer will touch.
+    Anything below a many=True relation has to be prefetched.
+    """
+    select, prefetch = [], []
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        if isinstance(field, serializers.ListSerializer):
+            path = _relation_path(field.source, prefix)
+            prefetch.append(path)
+            child_select, child_prefetch = get_prefetch_plan(field.child, path + '__')
+            prefetch += child_select + child_prefetch
+        elif isinstance(field, serializers.BaseSerializer):
+            path = _relation_path(field.source, prefix)
+            (prefetch if prefix else select).append(path)
+            child_select, child_prefetch = get_prefetch_plan(field, path + '__')
+            prefetch += child_select + child_prefetch
+        elif '.' in field.source:
+            path = _relation_path(field.source.rsplit('.', 1)[0], prefix)
+            (prefetch if prefix else select).append(path)
+    for lookup in getattr(getattr(serializer, 'Meta', None), 'prefetch_related', ()):
+        prefetch.append(prefix + lookup)
+    return select, prefetch
+
+
+def with_prefetch_plan(queryset, serializer_class, **serializer_kwargs):
+    select, prefetch = get_prefetch_plan(serializer_class(**serializer_kwargs))
+    if select:
+        queryset = queryset.select_related(*dict.fromkeys(select))
+    if prefetch:
+        queryset = queryset.prefetch_related(*dict.fromkeys(prefetch))
+    return queryset
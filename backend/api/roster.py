@@ -0,0 +1,142 @@
+"""
+Bulk enrollment. Students are looked up by id, username or email a chunk at
+a time, missing accounts can be created, and enrollments are inserted with
+bulk_create(ignore_conflicts=True) so rows that already exist are skipped
+instead of failing the batch. bulk_create bypasses the Enrollment signals, so
+the touched progress counters are recomputed per chunk.
+"""
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from .counters import recount_enrollments
+from .models import Role, User, Enrollment
+from .passwords import hash_many
+
+CHUNK = 1000
+DEFAULT_ROLE = 'Student'  # what UserSerializer.create assigns
+
+
+def chunks(items, size=CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def resolve_roles(names):
+    """{name: Role} for every name, creating the missing roles in one insert."""
+    names = set(names)
+    roles = {role.name: role for role in Role.objects.filter(name__in=names)}
+    missing = names - set(roles)
+    if missing:
+        Role.objects.bulk_create([Role(name=name) for name in missing], ignore_conflicts=True)
+        roles.update({role.name: role for role in Role.objects.filter(name__in=missing)})
+    return roles
+
+
+def find_users(rows):
+    """Map each row (dict with id, username and/or email) to an existing user id, two or three queries in all."""
+    ids = {int(row['id']) for row in rows if row.get('id')}
+    usernames = {row['username'] for row in rows if row.get('username')}
+    emails = {row['email'].lower() for row in rows if row.get('email') and not row.get('username')}
+    by_id = set(User.objects.filter(pk__in=ids).values_list('id', flat=True)) if ids else set()
+    by_username = dict(User.objects.filter(username__in=usernames).values_list('username', 'id')) if usernames else {}
+    by_email = {}
+    if emails:
+        # Emails are not unique and match case-insensitively; the oldest account wins
+        matches = User.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=emails)
+        for email, pk in matches.order_by('-id').values_list('email_lower', 'id'):
+            by_email[email] = pk
+
+    found = []
+    for row in rows:
+        if row.get('id'): found.append(int(row['id']) if int(row['id']) in by_id else None)
+        elif row.get('username'): found.append(by_username.get(row['username']))
+        else: found.append(by_email.get((row.get('email') or '').lower()))
+    return found
+
+
+def username_for(row):
+    return row.get('username') or row.get('email')
+
+
+def create_users(rows, password=None):
+    """
+    Create accounts for rows that have no user yet. The username falls back to
+    the email address. Per-row passwords are hashed in parallel; otherwise
+    `password` is hashed once and shared, and without one the accounts get
+    unusable passwords until they are reset.
+
+    Returns ({username: id} of the accounts actually created, rows whose
+    username already belongs to another account). Repeated usernames within
+    `rows` create one account.
+    """
+    taken = set(User.objects.filter(username__in={username_for(row) for row in rows}).values_list('username', flat=True))
+    conflicts = [row for row in rows if username_for(row) in taken]
+    unique = {}
+    for row in rows:
+        if username_for(row) not in taken: unique.setdefault(username_for(row), row)
+    rows = list(unique.values())
+    if not rows: return {}, conflicts
+    roles = resolve_roles(row.get('role') or DEFAULT_ROLE for row in rows)
+    shared = make_password(password)
+    own = [row for row in rows if row.get('password')]
+    hashed = dict(zip(map(id, own), hash_many([row['password'] for row in own])))
+    users = [
+        User(username=username_for(row), email=row.get('email', ''),
+             first_name=row.get('first_name', ''), last_name=row.get('last_name', ''),
+             role=roles[row.get('role') or DEFAULT_ROLE], password=hashed.get(id(row), shared))
+        for row in rows
+    ]
+    User.objects.bulk_create(users, batch_size=CHUNK, ignore_conflicts=True)
+    # ignore_conflicts leaves pks unset on some backends, so read them back. A row that lost a race with
+    # another signup kept the other account's username; it is told apart by the password hash we set.
+    hashes = {user.username: user.password for user in users}
+    created = {}
+    for username, pk, stored in User.objects.filter(username__in=hashes).values_list('username', 'id', 'password'):
+        if stored == hashes[username]: created[username] = pk
+    conflicts += [row for row in rows if username_for(row) not in created]
+    return created, conflicts
+
+
+def enroll(course_id, student_ids):
+    """Enroll students in one course. Returns (enrolled, already_enrolled) counts."""
+    student_ids = list(dict.fromkeys(student_ids))
+    enrolled = existing = 0
+    with transaction.atomic():
+        for batch in chunks(student_ids):
+            present = set(Enrollment.objects.filter(course_id=course_id, student_id__in=batch).values_list('student_id', flat=True))
+            new = [pk for pk in batch if pk not in present]
+            Enrollment.objects.bulk_create([Enrollment(course_id=course_id, student_id=pk) for pk in new], ignore_conflicts=True)
+            if new:
+                recount_enrollments(Enrollment.objects.filter(course_id=course_id, student_id__in=new))
+            enrolled += len(new)
+            existing += len(present)
+    return enrolled, existing
+
+
+def import_roster(rows, course_id=None, create_missing=False, password=None):
+    """
+    Resolve (and optionally create) the users in `rows`, then enroll them in
+    `course_id` if given. Returns counts plus the rows that matched no user
+    and, with create_missing, the rows whose username belongs to another
+    account (neither is enrolled).
+    """
+    rows = [row for row in rows if row.get('id') or row.get('username') or row.get('email')]
+    student_ids, unmatched, conflicts, created = [], [], [], 0
+    with transaction.atomic():
+        for batch in chunks(rows):
+            found = find_users(batch)
+            missing = [row for row, pk in zip(batch, found) if pk is None]
+            if missing and create_missing:
+                new, clashed = create_users([row for row in missing if not row.get('id')], password)
+                created += len(new)
+                conflicts.extend(clashed)
+                found = [pk or new.get(username_for(row)) for row, pk in zip(batch, found)]
+            clashed_ids = set(map(id, conflicts))
+            student_ids.extend(pk for pk in found if pk is not None)
+            unmatched.extend(row for row, pk in zip(batch, found) if pk is None and id(row) not in clashed_ids)
+        enrolled, existing = enroll(course_id, student_ids) if course_id else (0, 0)
+    return {
+        'users_created': created, 'enrolled': enrolled, 'already_enrolled': existing,
+        'not_found': unmatched, 'conflicts': conflicts,
+    }
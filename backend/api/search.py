@@ -0,0 +1,133 @@
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, FloatField, OuterRef, Subquery, Sum
+from django.db.models.expressions import RawSQL
+
+from .models import Course, Lesson, Comment, SearchDocument, SearchTerm
+
+WORD = re.compile(r'\w+')
+STOPWORDS = frozenset('a an and are as at be by for from in is it of on or that the this to was with'.split())
+TITLE_WEIGHT = 3
+CHUNK = 2000
+
+# (id, course id, category, title, body) for each kind of indexed object.
+# Comments carry their lesson's title so a hit says where it was posted.
+SOURCES = {
+    SearchDocument.COURSE: lambda: Course.objects.values_list('id', 'id', 'category', 'title', 'description'),
+    SearchDocument.LESSON: lambda: Lesson.objects.values_list(
+        'id', 'module__course_id', 'module__course__category', 'title', 'content'),
+    SearchDocument.COMMENT: lambda: Comment.objects.values_list(
+        'id', 'lesson__module__course_id', 'lesson__module__course__category', 'lesson__title', 'text'),
+}
+
+
+def tokenize(text):
+    return [word for word in WORD.findall(text.casefold()) if len(word) > 1 and word not in STOPWORDS]
+
+
+def backend():
+    if settings.SEARCH_BACKEND != 'auto': return settings.SEARCH_BACKEND
+    return _detect_backend()
+
+
+@lru_cache(maxsize=None)
+def _detect_backend():
+    if connection.vendor == 'mysql': return 'mysql'
+    # The FTS5 table only exists if SQLite was built with it (see migration 0013)
+    if connection.vendor == 'sqlite' and 'search_fts' in connection.introspection.table_names(): return 'fts5'
+    return 'terms'
+
+
+def _write_terms(documents):
+    SearchTerm.objects.filter(document__in=documents).delete()
+    terms = []
+    for document in documents:
+        counts = Counter(tokenize(document.body))
+        for word in tokenize(document.title):
+            counts[word] += TITLE_WEIGHT
+        terms.extend(SearchTerm(document=document, term=word[:64], weight=1 + math.log(n)) for word, n in counts.items())
+    SearchTerm.objects.bulk_create(terms, batch_size=5000)
+
+
+def index(kind, ids):
+    """(Re)index objects of one kind by id; ids that no longer exist are dropped from the index."""
+    ids = list(ids)
+    if not ids: return
+    rows = SOURCES[kind]().filter(pk__in=ids)
+    with transaction.atomic():
+        SearchDocument.objects.filter(kind=kind, object_id__in=ids).delete()
+        documents = SearchDocument.objects.bulk_create([
+            SearchDocument(kind=kind, object_id=pk, course_id=course_id, category=category, title=title[:200], body=body)
+            for pk, course_id, category, title, body in rows
+        ])
+        if backend() == 'terms' and documents:
+            if documents[0].pk is None:
+                documents = list(SearchDocument.objects.filter(kind=kind, object_id__in=ids))
+            _write_terms(documents)
+
+
+def remove(kind, pk):
+    SearchDocument.objects.filter(kind=kind, object_id=pk).delete()
+
+
+def reindex_course(course):
+    index(SearchDocument.COURSE, [course.pk])
+    SearchDocument.objects.filter(course_id=course.pk).exclude(category=course.category).update(category=course.category)
+
+
+def rebuild():
+    """Drop the index and rebuild it from every course, lesson and comment."""
+    SearchDocument.objects.all().delete()
+    counts = {}
+    for kind, source in SOURCES.items():
+        ids = list(source().values_list('id', flat=True).order_by('id'))
+        for start in range(0, len(ids), CHUNK):
+            index(kind, ids[start:start + CHUNK])
+        counts[kind] = len(ids)
+    return counts
+
+
+def search(query, category=None, kinds=None):
+    """Documents matching every word of the query (the last one as a prefix where supported), best first."""
+    words = list(dict.fromkeys(tokenize(query)))
+    queryset = SearchDocument.objects.all()
+    if category: queryset = queryset.filter(category=category)
+    if kinds: queryset = queryset.filter(kind__in=kinds)
+    if not words: return queryset.none()
+
+    engine = backend()
+    if engine == 'mysql':
+        expression = ' '.join(f'+{word}' for word in words) + '*'
+        match = RawSQL('MATCH (search_documents.title, search_documents.body) AGAINST (%s IN BOOLEAN MODE)', [expression])
+        return queryset.annotate(score=match).filter(score__gt=0).order_by('-score', 'id')
+    if engine == 'fts5':
+        expression = ' '.join(f'"{word}"' for word in words) + '*'
+        return queryset.extra(
+            tables=['search_fts'],
+            where=['search_fts.rowid = search_documents.id', 'search_fts MATCH %s'],
+            params=[expression],
+            # bm25 is lower-is-better; weight title hits over body hits
+            select={'score': f'-bm25(search_fts, {TITLE_WEIGHT}.0, 1.0)'},
+        ).order_by('-score', 'id')
+
+    matched = (SearchTerm.objects.filter(term__in=words).values('document')
+               .annotate(hits=Count('id')).filter(hits=len(words)).values('document'))
+    score = (SearchTerm.objects.filter(document=OuterRef('pk'), term__in=words).values('document')
+             .annotate(total=Sum('weight')).values('total'))
+    return queryset.filter(pk__in=matched).annotate(score=Subquery(score, output_field=FloatField())).order_by('-score', 'id')
+
+
+def snippet(body, query, width=160):
+    """A window of the body around the first query word, for result listings."""
+    text = ' '.join(body.split())
+    folded = text.casefold()
+    positions = [folded.find(word) for word in tokenize(query)]
+    first = min((p for p in positions if p >= 0), default=0)
+    start = max(0, first - width // 4)
+    excerpt = text[start:start + width]
+    return ('…' if start else '') + excerpt + ('…' if start + width < len(text) else '')
@@ -1,18 +1,74 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.urls import reverse
 from rest_framework import serializers
-from .models import User, Role, Course, Module, Lesson, Enrollment, Assignment, Submission, Quiz, Result, LessonCompletion, Announcement, Comment, Certificate
+from smartlms.metrics import serializer_timer
+from .grading import normalize_questions, public_questions
+from .uploads import received_parts
+from .search import snippet
+from .models import User, Role, Course, Module, Lesson, Enrollment, Assignment, Submission, Quiz, Result, LessonCompletion, Announcement, Comment, Certificate, UploadSession, SearchDocument
 
-class RoleSerializer(serializers.ModelSerializer):
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+BULK_LIMIT = 1000
+
+def _csv_param(request, name):
+    value = request.query_params.get(name, '')
+    return {part.strip() for part in value.split(',') if part.strip()}
+
+class DynamicFieldsMixin:
+    """
+    Lets read requests shape the top-level representation: ?fields=id,title
+    keeps only the named fields and ?expand=modules adds any of the
+    serializer's Meta.expandable_fields.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        expand = _csv_param(request, 'expand')
+        for name, (serializer_class, options) in getattr(self.Meta, 'expandable_fields', {}).items():
+            if name in expand:
+                self.fields[name] = serializer_class(**options)
+        only = _csv_param(request, 'fields')
+        if only:
+            for name in set(self.fields) - only - expand:
+                self.fields.pop(name)
+
+    def to_representation(self, instance):
+        with serializer_timer():
+            return super().to_representation(instance)
+
+class ImageVariantsField(serializers.Field):
+    """URLs of an image field's derivatives, {"320": {"webp": url, "jpeg": url}}; empty until they are built."""
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        super().__init__(source='*', read_only=True, **kwargs)
+
+    def to_representation(self, obj):
+        image = getattr(obj, self.image_field)
+        variants = getattr(obj, f'{self.image_field}_variants')
+        if not image or variants.get('source') != image.name: return {}
+        request = self.context.get('request')
+        url = request.build_absolute_uri if request is not None else str
+        return {
+            width: {extension: url(default_storage.url(name)) for extension, name in names.items()}
+            for width, names in variants['sizes'].items()
+        }
+
+class RoleSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Role
         fields = '__all__'
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     role_name = serializers.SerializerMethodField()
     role = serializers.CharField(write_only=True, required=False)
+    profile_picture_variants = ImageVariantsField('profile_picture')
 
     class Meta:
         model = User
-        fields = ['id', 'username', 'password', 'email', 'first_name', 'last_name', 'role', 'role_name', 'bio', 'profile_picture', 'date_joined']
+        fields = ['id', 'username', 'password', 'email', 'first_name', 'last_name', 'role', 'role_name', 'bio', 'profile_picture', 'profile_picture_variants', 'date_joined']
         extra_kwargs = {'password': {'write_only': True}}
     
     def get_role_name(self, obj):
@@ -29,88 +85,218 @@ class UserSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
+    author_name = serializers.CharField(source='user.display_name', read_only=True)
     class Meta:
         model = Comment
         fields = '__all__'
         read_only_fields = ['user']
 
-class LessonSerializer(serializers.ModelSerializer):
-    comments = CommentSerializer(many=True, read_only=True)
+class LatestCommentsField(serializers.Field):
+    """The newest comments the view prefetched into `latest_comments` (LessonViewSet, ?comments=N)."""
+    def __init__(self, **kwargs):
+        super().__init__(source='*', read_only=True, **kwargs)
+
+    def to_representation(self, lesson):
+        return CommentSerializer(getattr(lesson, 'latest_comments', []), many=True, context=self.context).data
+
+class LessonSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Comments are not embedded; they come from /lessons/<id>/comments/ (or a bounded preview)."""
     class Meta:
         model = Lesson
         fields = '__all__'
 
-class ModuleSerializer(serializers.ModelSerializer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.context.get('comment_preview'):
+            self.fields['latest_comments'] = LatestCommentsField()
+
+class ModuleSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     lessons = LessonSerializer(many=True, read_only=True)
     class Meta:
         model = Module
         fields = '__all__'
 
-class AnnouncementSerializer(serializers.ModelSerializer):
+class AnnouncementSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Announcement
         fields = '__all__'
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     modules = ModuleSerializer(many=True, read_only=True)
     announcements = AnnouncementSerializer(many=True, read_only=True)
     instructor_name = serializers.CharField(source='instructor.username', read_only=True)
+    thumbnail_variants = ImageVariantsField('thumbnail')
     class Meta:
         model = Course
         fields = '__all__'
         read_only_fields = ['instructor']
 
-class EnrollmentSerializer(serializers.ModelSerializer):
-    progress_percentage = serializers.SerializerMethodField()
+class CourseSummarySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    instructor_name = serializers.CharField(source='instructor.username', read_only=True)
+    module_count = serializers.IntegerField(read_only=True)
+    lesson_count = serializers.IntegerField(read_only=True)
+    thumbnail_variants = ImageVariantsField('thumbnail')
+    class Meta:
+        model = Course
+        fields = ['id', 'title', 'description', 'category', 'thumbnail', 'thumbnail_variants', 'instructor', 'instructor_name', 'created_at', 'module_count', 'lesson_count']
+        expandable_fields = {
+            'modules': (ModuleSerializer, {'many': True, 'read_only': True}),
+            'announcements': (AnnouncementSerializer, {'many': True, 'read_only': True}),
+        }
+
+class EnrollmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    progress_percentage = serializers.IntegerField(read_only=True)
     class Meta:
         model = Enrollment
         fields = '__all__'
         read_only_fields = ['student']
 
-    def get_progress_percentage(self, obj):
-        try:
-            total_lessons = Lesson.objects.filter(module__course=obj.course).count()
-            if total_lessons == 0: return 0
-            completed_lessons = LessonCompletion.objects.filter(student=obj.student, lesson__module__course=obj.course).count()
-            return round((completed_lessons / total_lessons) * 100)
-        except:
-            return 0
-
     def to_representation(self, instance):
         rep = super().to_representation(instance)
-        rep['course'] = CourseSerializer(instance.course).data
+        if 'course' in rep:
+            rep['course'] = CourseSummarySerializer(instance.course).data
         return rep
 
-class AssignmentSerializer(serializers.ModelSerializer):
+class AssignmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Assignment
         fields = '__all__'
 
-class SubmissionSerializer(serializers.ModelSerializer):
+class SubmissionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Submission
         fields = '__all__'
 
-class QuizSerializer(serializers.ModelSerializer):
+    def to_representation(self, instance):
+        rep = super().to_representation(instance)
+        # Submission files are not public media; point at the authorized download instead
+        if rep.get('file'):
+            url = reverse('submission-download', args=[instance.pk])
+            request = self.context.get('request')
+            rep['file'] = request.build_absolute_uri(url) if request is not None else url
+        return rep
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    parts = serializers.IntegerField(read_only=True)
+    received_parts = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'assignment', 'filename', 'size', 'checksum', 'part_size', 'parts', 'received_parts', 'created_at',
+                  'status', 'error', 'submission']
+        read_only_fields = ['part_size', 'created_at', 'status', 'error', 'submission']
+
+    def get_received_parts(self, obj):
+        return received_parts(obj)
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f'Size must be between 1 and {settings.UPLOAD_MAX_SIZE} bytes.')
+        return value
+
+    def validate_checksum(self, value):
+        value = value.lower()
+        if len(value) != 64 or any(c not in '0123456789abcdef' for c in value):
+            raise serializers.ValidationError('Expected a hex sha256 digest.')
+        return value
+
+class QuizSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Quiz
         fields = '__all__'
 
-class ResultSerializer(serializers.ModelSerializer):
+    def validate_questions(self, value):
+        return normalize_questions(value)
+
+    def to_representation(self, instance):
+        rep = super().to_representation(instance)
+        # Only the course instructor and staff get the answer key
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if 'questions' in rep and not (user and (user.is_staff or user.pk == instance.module.course.instructor_id)):
+            rep['questions'] = public_questions(rep.get('questions'))
+        return rep
+
+class QuizSubmissionSerializer(serializers.Serializer):
+    answers = serializers.DictField()
+
+class QuizAttemptSerializer(serializers.Serializer):
+    student = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
+    answers = serializers.DictField()
+
+class QuizBatchSerializer(serializers.Serializer):
+    attempts = QuizAttemptSerializer(many=True, allow_empty=False)
+
+    def validate_attempts(self, value):
+        if len(value) > BULK_LIMIT:
+            raise serializers.ValidationError(f"At most {BULK_LIMIT} attempts per request.")
+        return value
+
+class ResultSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Result
         fields = '__all__'
+        read_only_fields = ['student', 'score']
 
-class LessonCompletionSerializer(serializers.ModelSerializer):
+class LessonCompletionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = LessonCompletion
         fields = '__all__'
         read_only_fields = ['student']
 
-class CertificateSerializer(serializers.ModelSerializer):
+class BulkLessonCompletionSerializer(serializers.Serializer):
+    lessons = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=BULK_LIMIT)
+
+class BulkEnrollmentSerializer(serializers.Serializer):
+    course = serializers.IntegerField(min_value=1)
+    students = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, max_length=BULK_LIMIT)
+    usernames = serializers.ListField(child=serializers.CharField(), required=False, max_length=BULK_LIMIT)
+    emails = serializers.ListField(child=serializers.EmailField(), required=False, max_length=BULK_LIMIT)
+
+    def validate(self, attrs):
+        if not any(attrs.get(key) for key in ('students', 'usernames', 'emails')):
+            raise serializers.ValidationError("Give students, usernames or emails.")
+        return attrs
+
+class GradeItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
+    student = serializers.IntegerField(required=False)
+    grade = serializers.FloatField(allow_null=True)
+    feedback = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        if 'id' not in attrs and 'student' not in attrs:
+            raise serializers.ValidationError("Each grade needs a submission id or a student.")
+        return attrs
+
+class BulkGradeSerializer(serializers.Serializer):
+    assignment = serializers.IntegerField(required=False)
+    grades = GradeItemSerializer(many=True, allow_empty=False)
+
+    def validate(self, attrs):
+        if len(attrs['grades']) > BULK_LIMIT:
+            raise serializers.ValidationError(f"At most {BULK_LIMIT} grades per request.")
+        if 'assignment' not in attrs and any('id' not in item for item in attrs['grades']):
+            raise serializers.ValidationError("assignment is required when grades are keyed by student.")
+        return attrs
+
+class CertificateSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     course_name = serializers.CharField(source='course.title', read_only=True)
     class Meta:
         model = Certificate
         fields = '__all__'
+
+class SearchResultSerializer(serializers.ModelSerializer):
+    type = serializers.CharField(source='kind')
+    id = serializers.IntegerField(source='object_id')
+    score = serializers.FloatField()
+    snippet = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SearchDocument
+        fields = ['type', 'id', 'course', 'category', 'title', 'snippet', 'score']
+
+    def get_snippet(self, obj):
+        return snippet(obj.body, self.context.get('query', ''))
@@ -0,0 +1,312 @@
+from django.db.models import F, Q, QuerySet
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    User, Role, Course, Module, Lesson, Enrollment, LessonCompletion, Announcement, Comment, Quiz, Result,
+    CourseEnrollmentDaily, LessonCompletionRollup, QuizScoreRollup, SearchDocument, Tombstone,
+)
+from .analytics import forget_deleted_row, is_direct_delete
+from .cache import bump_content_version
+from .images import needs_variants
+from .jobs import build_image_variants, reindex_lesson_comments
+from .tasks import enqueue
+from . import authentication, counters, events, search
+
+
+# Progress counters: Course.lesson_count, Course.module_count and
+# Enrollment.completed_lessons are adjusted in place on every write so reads
+# never have to COUNT.
+
+@receiver(pre_save, sender=Module)
+def remember_module_course(sender, instance, **kwargs):
+    if instance._state.adding: return
+    instance._previous_course_id = Module.objects.filter(pk=instance.pk).values_list('course_id', flat=True).first()
+
+@receiver(post_save, sender=Module)
+def module_moved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_course_id', None)
+    if created:
+        counters.shift_module_count(instance.course_id, 1)
+    elif previous != instance.course_id:
+        counters.recount_course_tree([previous, instance.course_id])
+
+# Counters on rows deleted in the same cascade are not decremented one by one:
+# a deleted course takes them along, and a directly deleted module or lesson
+# recounts its course once.
+
+@receiver(post_delete, sender=Module)
+def module_deleted(sender, instance, origin=None, **kwargs):
+    if is_direct_delete(sender, origin): counters.recount_course_tree([instance.course_id])
+
+@receiver(pre_save, sender=Lesson)
+def remember_lesson_course(sender, instance, **kwargs):
+    if instance._state.adding: return
+    instance._previous_course_id = Module.objects.filter(lessons=instance.pk).values_list('course_id', flat=True).first()
+
+@receiver(post_save, sender=Lesson)
+def lesson_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.shift_lesson_count(instance.module_id, 1)
+    elif instance._previous_course_id != instance.module.course_id:
+        counters.recount_course_tree([instance._previous_course_id, instance.module.course_id])
+
+@receiver(post_delete, sender=Lesson)
+def lesson_deleted(sender, instance, origin=None, **kwargs):
+    if not is_direct_delete(sender, origin): return
+    counters.recount_course_tree(Module.objects.filter(pk=instance.module_id).values_list('course_id', flat=True))
+
+@receiver(pre_save, sender=Enrollment)
+def seed_completed_lessons(sender, instance, **kwargs):
+    if not instance._state.adding: return
+    instance.completed_lessons = LessonCompletion.objects.filter(
+        student_id=instance.student_id, lesson__module__course_id=instance.course_id
+    ).count()
+
+@receiver(pre_save, sender=LessonCompletion)
+def remember_completed_lesson(sender, instance, **kwargs):
+    if instance._state.adding: return
+    instance._previous_lesson_id = LessonCompletion.objects.filter(pk=instance.pk).values_list('lesson_id', flat=True).first()
+
+@receiver(post_save, sender=LessonCompletion)
+def lesson_completed(sender, instance, created, **kwargs):
+    if created:
+        counters.shift_completed_lessons(instance.student_id, instance.lesson_id, 1)
+    elif instance._previous_lesson_id != instance.lesson_id:
+        counters.shift_completed_lessons(instance.student_id, instance._previous_lesson_id, -1)
+        counters.shift_completed_lessons(instance.student_id, instance.lesson_id, 1)
+
+@receiver(post_delete, sender=LessonCompletion)
+def lesson_uncompleted(sender, instance, origin=None, **kwargs):
+    # A deleted student takes their enrollments along
+    if not is_direct_delete(sender, origin): return
+    counters.shift_completed_lessons(instance.student_id, instance.lesson_id, -1)
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_lesson(sender, instance, **kwargs):
+    if instance._state.adding: return
+    instance._previous_lesson_id = Comment.objects.filter(pk=instance.pk).values_list('lesson_id', flat=True).first()
+
+@receiver(post_save, sender=Comment)
+def comment_counted(sender, instance, created, **kwargs):
+    if created:
+        counters.shift_comment_count(instance.lesson_id, 1)
+    elif instance._previous_lesson_id != instance.lesson_id:
+        counters.shift_comment_count(instance._previous_lesson_id, -1)
+        counters.shift_comment_count(instance.lesson_id, 1)
+
+@receiver(post_delete, sender=Comment)
+def comment_uncounted(sender, instance, origin=None, **kwargs):
+    if is_direct_delete(sender, origin): counters.shift_comment_count(instance.lesson_id, -1)
+
+# A deleted user's comments go with them, from lessons that stay
+@receiver(pre_delete, sender=User)
+def remember_commented_lessons(sender, instance, **kwargs):
+    instance._commented_lesson_ids = set(Comment.objects.filter(user=instance).values_list('lesson_id', flat=True))
+
+@receiver(post_delete, sender=User)
+def user_comments_uncounted(sender, instance, **kwargs):
+    lesson_ids = getattr(instance, '_commented_lesson_ids', None)
+    if lesson_ids: counters.recount_lessons(Lesson.objects.filter(pk__in=lesson_ids))
+
+
+# Content cache: any change inside a course tree moves the course to a new
+# content_version, which retires every cached copy of it at once.
+
+@receiver(post_save, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    bump_content_version(course_id=instance.pk)
+
+@receiver([post_save, post_delete], sender=Module)
+def module_changed(sender, instance, **kwargs):
+    bump_content_version(course_id=instance.course_id)
+    previous = getattr(instance, '_previous_course_id', None)
+    if previous not in (None, instance.course_id): bump_content_version(course_id=previous)
+
+@receiver([post_save, post_delete], sender=Lesson)
+def lesson_changed(sender, instance, **kwargs):
+    bump_content_version(module_id=instance.module_id)
+    previous = getattr(instance, '_previous_course_id', None)
+    if previous is not None: bump_content_version(course_id=previous)
+
+@receiver([post_save, post_delete], sender=Announcement)
+def announcement_changed(sender, instance, **kwargs):
+    bump_content_version(course_id=instance.course_id)
+
+# Lessons carry comment_count and, on request, a preview of the newest comments
+@receiver([post_save, post_delete], sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    bump_content_version(lesson_id=instance.lesson_id)
+    previous = getattr(instance, '_previous_lesson_id', None)
+    if previous not in (None, instance.lesson_id): bump_content_version(lesson_id=previous)
+
+
+# Trees carry the instructor's username and comment authors' display names
+@receiver(pre_save, sender=User)
+def remember_user_names(sender, instance, **kwargs):
+    if instance._state.adding: return
+    instance._previous_names = User.objects.filter(pk=instance.pk).values_list('username', 'first_name', 'last_name').first()
+
+@receiver(post_save, sender=User)
+def user_renamed(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_names', None)
+    if created or previous in (None, (instance.username, instance.first_name, instance.last_name)): return
+    bump_content_version(courses=Course.objects.filter(Q(instructor=instance) | Q(modules__lessons__comments__user=instance)))
+
+
+# Quiz grading: compiled answer keys are cached per (quiz, version).
+
+@receiver(pre_save, sender=Quiz)
+def bump_quiz_version(sender, instance, **kwargs):
+    if not instance._state.adding: instance.version += 1
+
+
+# Analytics rollups count rows up to a watermark; a directly deleted row that
+# was already counted is taken back out.
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_removed_from_rollup(sender, instance, origin=None, **kwargs):
+    if not is_direct_delete(sender, origin): return
+    forget_deleted_row('enrollments', instance, lambda e: CourseEnrollmentDaily.objects.filter(
+        course_id=e.course_id, date=timezone.localdate(e.enrolled_at)).update(enrollments=F('enrollments') - 1))
+
+@receiver(post_delete, sender=LessonCompletion)
+def completion_removed_from_rollup(sender, instance, origin=None, **kwargs):
+    if not is_direct_delete(sender, origin): return
+    forget_deleted_row('lesson_completions', instance, lambda c: LessonCompletionRollup.objects.filter(
+        lesson_id=c.lesson_id).update(completions=F('completions') - 1))
+
+@receiver(post_delete, sender=Result)
+def result_removed_from_rollup(sender, instance, origin=None, **kwargs):
+    if not is_direct_delete(sender, origin): return
+    forget_deleted_row('results', instance, lambda r: QuizScoreRollup.objects.filter(
+        quiz_id=r.quiz_id).update(attempts=F('attempts') - 1, score_sum=F('score_sum') - r.score))
+
+
+# Image derivatives: resized WebP/JPEG copies are built in the background
+# whenever an original is uploaded or replaced.
+
+@receiver(post_save, sender=Course)
+def course_thumbnail_saved(sender, instance, **kwargs):
+    if needs_variants(instance, 'thumbnail'):
+        enqueue(build_image_variants, key=f'images:course:{instance.pk}', model='api.Course', pk=instance.pk, field='thumbnail')
+
+@receiver(post_save, sender=User)
+def profile_picture_saved(sender, instance, **kwargs):
+    if needs_variants(instance, 'profile_picture'):
+        enqueue(build_image_variants, key=f'images:user:{instance.pk}', model='api.User', pk=instance.pk, field='profile_picture')
+
+
+# Search index: documents are rewritten as their source rows change.
+
+@receiver(post_save, sender=Course)
+def course_indexed(sender, instance, **kwargs):
+    search.reindex_course(instance)
+
+@receiver(post_save, sender=Lesson)
+def lesson_indexed(sender, instance, created, **kwargs):
+    search.index(SearchDocument.LESSON, [instance.pk])
+    if not created:
+        enqueue(reindex_lesson_comments, key=f'search:lesson-comments:{instance.pk}', lesson_id=instance.pk)
+
+@receiver(post_save, sender=Module)
+def module_indexed(sender, instance, created, **kwargs):
+    # A module moved to another course takes its lessons' documents along
+    if not created and getattr(instance, '_previous_course_id', None) != instance.course_id:
+        lessons = list(instance.lessons.values_list('id', flat=True))
+        search.index(SearchDocument.LESSON, lessons)
+        for lesson_id in lessons:
+            enqueue(reindex_lesson_comments, key=f'search:lesson-comments:{lesson_id}', lesson_id=lesson_id)
+
+@receiver(post_save, sender=Comment)
+def comment_indexed(sender, instance, **kwargs):
+    search.index(SearchDocument.COMMENT, [instance.pk])
+
+@receiver(post_delete, sender=Lesson)
+def lesson_unindexed(sender, instance, **kwargs):
+    search.remove(SearchDocument.LESSON, instance.pk)
+
+@receiver(post_delete, sender=Comment)
+def comment_unindexed(sender, instance, **kwargs):
+    search.remove(SearchDocument.COMMENT, instance.pk)
+
+
+# Authentication cache: cached user snapshots are dropped when the user or
+# their role changes (in this process; others wait out AUTH_CACHE_SECONDS).
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    authentication.evict_user(instance.pk)
+
+@receiver([post_save, post_delete], sender=Role)
+def role_changed(sender, instance, **kwargs):
+    authentication.evict_role(instance.pk)
+
+
+# Delta sync: deletions leave a tombstone so polling clients can drop the row.
+# A direct delete writes its own; rows removed by a cascade are tombstoned in
+# one bulk insert by the parent being deleted, before they go.
+
+TOMBSTONED = {
+    Enrollment: ('enrollments', 'student_id'),
+    LessonCompletion: ('lesson-completions', 'student_id'),
+    Announcement: ('announcements', None),
+    Comment: ('comments', None),
+}
+
+# Lookups from each tombstoned model to the parents whose delete cascades to it
+CASCADE_PATHS = {
+    Enrollment: {User: ['student', 'course__instructor'], Course: ['course']},
+    LessonCompletion: {
+        User: ['student', 'lesson__module__course__instructor'], Course: ['lesson__module__course'],
+        Module: ['lesson__module'], Lesson: ['lesson'],
+    },
+    Announcement: {User: ['course__instructor'], Course: ['course']},
+    Comment: {
+        User: ['user', 'lesson__module__course__instructor'], Course: ['lesson__module__course'],
+        Module: ['lesson__module'], Lesson: ['lesson'],
+    },
+}
+
+def _origin_model(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+def _tombstone(row):
+    kind, owner = TOMBSTONED[type(row)]
+    return Tombstone(kind=kind, object_id=row.pk, owner_id=getattr(row, owner) if owner else None)
+
+@receiver(pre_delete, sender=User)
+@receiver(pre_delete, sender=Course)
+@receiver(pre_delete, sender=Module)
+@receiver(pre_delete, sender=Lesson)
+def parent_deleting(sender, instance, origin=None, **kwargs):
+    if not is_direct_delete(sender, origin): return
+    tombstones = []
+    for model, parents in CASCADE_PATHS.items():
+        if sender not in parents: continue
+        match = Q()
+        for path in parents[sender]: match |= Q(**{path: instance.pk})
+        fields = [name for name in ('pk', TOMBSTONED[model][1]) if name]
+        tombstones += [_tombstone(row) for row in model.objects.filter(match).only(*fields)]
+    Tombstone.objects.bulk_create(tombstones, batch_size=1000)
+
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_delete, sender=LessonCompletion)
+@receiver(post_delete, sender=Announcement)
+@receiver(post_delete, sender=Comment)
+def row_deleted(sender, instance, origin=None, **kwargs):
+    if not is_direct_delete(sender, origin) and _origin_model(origin) in CASCADE_PATHS[sender]: return
+    _tombstone(instance).save()
+
+
+# Live events: new announcements and comments go out to this process's SSE
+# subscribers on commit; other processes find them by polling.
+
+@receiver(post_save, sender=Announcement)
+def announcement_posted(sender, instance, created, **kwargs):
+    if created: events.publish_on_commit(events.announcement_event, instance)
+
+@receiver(post_save, sender=Comment)
+def comment_posted(sender, instance, created, **kwargs):
+    if created: events.publish_on_commit(events.comment_event, instance)
@@ -0,0 +1,117 @@
+"""
+Delta sync. With ?since=<cursor> a list endpoint returns only the rows
+created or changed (by updated_at) and the ids deleted (by Tombstone) after
+the cursor, plus the cursor for the next poll. ?since= with no value starts
+from the beginning. The cursor is opaque to clients and holds a keyset
+position per feed, so one cursor serves both a single list and /api/sync/.
+
+A write that commits late can carry an updated_at slightly older than rows
+already sent, so the cursor never moves past SYNC_SETTLE_SECONDS ago: the
+newest rows are sent again on the next poll and clients upsert by id.
+"""
+import base64
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from .models import Tombstone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+START = (EPOCH, 0)
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'This sync cursor is older than the kept deletions; fetch the full list again.'
+    default_code = 'cursor_expired'
+
+
+def _micros(moment):
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def encode_cursor(positions):
+    """positions: {feed: ((updated_at, id), (deleted_at, id))}"""
+    raw = {feed: [_micros(rows[0]), rows[1], _micros(deletes[0]), deletes[1]] for feed, (rows, deletes) in positions.items()}
+    return base64.urlsafe_b64encode(json.dumps(raw, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor: return {}
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return {
+            feed: ((EPOCH + timedelta(microseconds=a), int(b)), (EPOCH + timedelta(microseconds=c), int(d)))
+            for feed, (a, b, c, d) in raw.items()
+        }
+    except (ValueError, TypeError, AttributeError):
+        raise ValidationError({'since': 'Invalid sync cursor.'})
+
+
+def _after(queryset, field, position, limit, horizon):
+    """Rows past a (timestamp, id) keyset position, the next position, and whether more remain."""
+    moment, pk = position
+    rows = list(queryset.filter(Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'pk__gt': pk}))
+                .order_by(field, 'pk')[:limit + 1])
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = (getattr(rows[-1], field), rows[-1].pk)
+        if last[0] <= horizon: return rows, last, True
+        # The page runs into the unsettled window: hold the cursor at the horizon like a short page
+        # does. The rest is sent on later polls as the horizon moves, so don't ask for one right away.
+        return rows, max(position, (horizon, 0)), False
+    return rows, max(position, (horizon, 0)), False
+
+
+def changes(view, position, limit=None):
+    """The changed rows and deleted ids of one DeltaSyncMixin view after `position`."""
+    limit = limit or settings.SYNC_PAGE_SIZE
+    now = timezone.now()
+    rows_position, deletes_position = position or (START, START)
+    if START < deletes_position and deletes_position[0] < now - timedelta(days=settings.SYNC_TOMBSTONE_DAYS):
+        raise CursorExpired()
+
+    horizon = now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    rows, rows_position, more_rows = _after(view.get_queryset(), 'updated_at', rows_position, limit, horizon)
+    deletes, deletes_position, more_deletes = _after(view.get_tombstones(), 'deleted_at', deletes_position, limit, horizon)
+    return {
+        'changed': view.get_serializer(rows, many=True).data,
+        'deleted': [tombstone.object_id for tombstone in deletes],
+    }, (rows_position, deletes_position), more_rows or more_deletes
+
+
+class DeltaSyncMixin:
+    """Adds ?since=<cursor> to a viewset's list action. Set `sync_feed` to the Tombstone kind."""
+    sync_feed = None
+
+    def get_tombstones(self):
+        return Tombstone.objects.filter(kind=self.sync_feed)
+
+    def list(self, request, *args, **kwargs):
+        if 'since' not in request.query_params: return super().list(request, *args, **kwargs)
+        cursor = decode_cursor(request.query_params['since'])
+        data, position, more = changes(self, cursor.get(self.sync_feed))
+        return Response({'cursor': encode_cursor({self.sync_feed: position}), 'more': more, **data})
+
+
+def sync_all(request, viewsets, cursor):
+    """Every feed the user can see in one response; `more` means poll again right away."""
+    positions = decode_cursor(cursor)
+    feeds, more = {}, False
+    for viewset in viewsets:
+        view = viewset(request=request, args=(), kwargs={}, format_kwarg=None, action='list')
+        feed = viewset.sync_feed
+        feeds[feed], positions[feed], feed_more = changes(view, positions.get(feed))
+        more = more or feed_more
+    return {'cursor': encode_cursor(positions), 'more': more, 'feeds': feeds}
+
+
+def purge_tombstones(days=None):
+    cutoff = timezone.now() - timedelta(days=days or settings.SYNC_TOMBSTONE_DAYS)
+    return Tombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
@@ -0,0 +1,195 @@
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+class TaskSpec:
+    def __init__(self, func, name, max_retries, retry_delay):
+        self.func = func
+        self.name = name
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+    def backoff(self, attempts):
+        return self.retry_delay * (2 ** (attempts - 1))
+
+
+def task(name=None, max_retries=3, retry_delay=30):
+    """
+    Register a function as a background task. Task functions receive
+    JSON-serializable keyword arguments and must be safe to run twice.
+    """
+    def decorator(func):
+        spec = TaskSpec(func, name or func.__name__, max_retries, retry_delay)
+        registry[spec.name] = spec
+        func.task_name = spec.name
+        return func
+    return decorator
+
+
+class ImmediateBackend:
+    """Runs tasks inline once the transaction commits. Handy for local debugging."""
+
+    def enqueue(self, name, kwargs, key):
+        registry[name].func(**kwargs)
+
+
+class LocalBackend:
+    """
+    In-process thread pool. Tasks with the same key are coalesced while one
+    is pending; failures are retried with exponential backoff. Queued work is
+    lost if the process exits, so use the db backend where that matters.
+    """
+
+    def __init__(self, workers):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='slms-task')
+        self.pending = set()
+        self.lock = threading.Lock()
+
+    def enqueue(self, name, kwargs, key, attempts=0):
+        if key:
+            with self.lock:
+                if key in self.pending: return
+                self.pending.add(key)
+        self.executor.submit(self.run, name, kwargs, key, attempts)
+
+    def run(self, name, kwargs, key, attempts):
+        spec = registry[name]
+        if key:
+            with self.lock: self.pending.discard(key)
+        close_old_connections()
+        try:
+            spec.func(**kwargs)
+        except Exception:
+            attempts += 1
+            logger.exception('Task %s failed (attempt %d)', name, attempts)
+            if attempts <= spec.max_retries:
+                timer = threading.Timer(spec.backoff(attempts), self.enqueue, (name, kwargs, key, attempts))
+                timer.daemon = True
+                timer.start()
+        finally:
+            close_old_connections()
+
+
+class DatabaseBackend:
+    """
+    Durable queue stored in the tasks table and drained by `manage.py run_tasks`.
+    Needs no broker; any number of workers can share it. A claim is a lease,
+    renewed for the rest of a worker's batch each time it starts a task: rows
+    left running past TASK_LEASE_SECONDS (the worker died) are retried.
+    """
+
+    def enqueue(self, name, kwargs, key):
+        if key and Task.objects.filter(key=key, status=Task.QUEUED).exists(): return
+        Task.objects.create(name=name, payload=kwargs, key=key or '', run_after=timezone.now())
+
+    def retry_or_fail(self, job, spec):
+        if spec is not None and job.attempts <= spec.max_retries:
+            job.status = Task.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=spec.backoff(job.attempts))
+        else:
+            job.status = Task.FAILED
+
+    def requeue_expired(self):
+        """Count an expired lease as a failed attempt and schedule the retry."""
+        cutoff = timezone.now() - timedelta(seconds=settings.TASK_LEASE_SECONDS)
+        with transaction.atomic():
+            expired = list(Task.objects.select_for_update(skip_locked=True).filter(status=Task.RUNNING, claimed_at__lt=cutoff))
+            for job in expired:
+                job.attempts += 1
+                job.last_error = f'Lease expired after {settings.TASK_LEASE_SECONDS}s; the worker running it stopped.'
+                self.retry_or_fail(job, registry.get(job.name))
+                job.save(update_fields=['status', 'attempts', 'run_after', 'last_error'])
+                logger.warning('Task %s #%s lease expired (attempt %d)', job.name, job.pk, job.attempts)
+        return len(expired)
+
+    def claim(self, limit):
+        self.requeue_expired()
+        now = timezone.now()
+        with transaction.atomic():
+            batch = list(
+                Task.objects.select_for_update(skip_locked=True)
+                .filter(status=Task.QUEUED, run_after__lte=now)
+                .order_by('run_after', 'id')[:limit]
+            )
+            Task.objects.filter(pk__in=[t.pk for t in batch]).update(status=Task.RUNNING, claimed_at=now)
+        for job in batch: job.claimed_at = now
+        return batch
+
+    def execute(self, job):
+        spec = registry.get(job.name)
+        job.attempts += 1
+        try:
+            if spec is None: raise LookupError(f'Unknown task {job.name}')
+            spec.func(**job.payload)
+        except Exception:
+            job.last_error = traceback.format_exc()
+            self.retry_or_fail(job, spec)
+            logger.exception('Task %s #%s failed (attempt %d)', job.name, job.pk, job.attempts)
+        else:
+            job.status = Task.DONE
+        # If the lease expired meanwhile the row was requeued (and maybe claimed again); leave it alone
+        Task.objects.filter(pk=job.pk, status=Task.RUNNING, claimed_at=job.claimed_at).update(
+            status=job.status, attempts=job.attempts, run_after=job.run_after,
+            last_error=job.last_error, claimed_at=timezone.now(),
+        )
+
+    def renew(self, jobs):
+        """Restart the lease of claimed jobs still waiting their turn; returns the ones this worker still holds."""
+        if not jobs: return jobs
+        now = timezone.now()
+        pks = [job.pk for job in jobs]
+        renewed = Task.objects.filter(pk__in=pks, status=Task.RUNNING, claimed_at=jobs[0].claimed_at).update(claimed_at=now)
+        if renewed < len(jobs):
+            # Some leases ran out and were requeued, maybe already claimed by another worker
+            held = set(Task.objects.filter(pk__in=pks, status=Task.RUNNING, claimed_at=now).values_list('pk', flat=True))
+            jobs = [job for job in jobs if job.pk in held]
+        for job in jobs: job.claimed_at = now
+        return jobs
+
+    def run_pending(self, limit=100):
+        batch = self.claim(limit)
+        # Renewing the rest of the batch before each task keeps queued jobs from expiring behind a slow one
+        waiting = batch
+        while waiting := self.renew(waiting):
+            self.execute(waiting.pop(0))
+        return len(batch)
+
+    def purge(self, days=None):
+        """Delete done and failed rows last touched more than TASK_KEEP_DAYS ago."""
+        cutoff = timezone.now() - timedelta(days=settings.TASK_KEEP_DAYS if days is None else days)
+        return Task.objects.filter(status__in=[Task.DONE, Task.FAILED], claimed_at__lt=cutoff).delete()[0]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = getattr(settings, 'TASK_BACKEND', 'local')
+            if name == 'db': _backend = DatabaseBackend()
+            elif name == 'immediate': _backend = ImmediateBackend()
+            else: _backend = LocalBackend(getattr(settings, 'TASK_WORKERS', 4))
+    return _backend
+
+
+def enqueue(func_or_name, key=None, **kwargs):
+    """Schedule a registered task to run after the current transaction commits."""
+    name = getattr(func_or_name, 'task_name', func_or_name)
+    if name not in registry: raise LookupError(f'Unknown task {name}')
+    transaction.on_commit(lambda: get_backend().enqueue(name, kwargs, key))
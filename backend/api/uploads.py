@@ -0,0 +1,151 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from rest_framework.exceptions import ValidationError
+
+from .models import Submission, UploadSession
+
+READ_SIZE = 1024 * 1024
+
+
+def session_dir(session):
+    return os.path.join(settings.MEDIA_ROOT, 'uploads', str(session.pk))
+
+
+def part_path(session, number):
+    return os.path.join(session_dir(session), f'{number:06d}.part')
+
+
+def part_length(session, number):
+    if number == session.parts - 1:
+        return session.size - number * session.part_size
+    return session.part_size
+
+
+def received_parts(session):
+    try:
+        names = os.listdir(session_dir(session))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name[:-5]) for name in names if name.endswith('.part'))
+
+
+def write_part(session, number, stream, checksum=None):
+    """
+    Stream one part from the request body to disk, READ_SIZE bytes at a time.
+    The part is written under a temporary name and renamed once complete, so a
+    dropped connection never leaves a truncated part behind and a retry simply
+    replaces it.
+    """
+    if session.status != UploadSession.RECEIVING:
+        raise ValidationError(f'This upload takes no more parts (status: {session.status}).')
+    if not 0 <= number < session.parts:
+        raise ValidationError(f'Part number must be between 0 and {session.parts - 1}.')
+    if stream is None:
+        raise ValidationError('Empty part.')
+    expected = part_length(session, number)
+    os.makedirs(session_dir(session), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=session_dir(session), suffix='.tmp')
+    digest, written = hashlib.sha256(), 0
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while written <= expected:
+                chunk = stream.read(min(READ_SIZE, expected - written + 1))
+                if not chunk: break
+                written += len(chunk)
+                digest.update(chunk)
+                out.write(chunk)
+        if written != expected:
+            raise ValidationError(f'Part {number} must be exactly {expected} bytes.')
+        if checksum and digest.hexdigest() != checksum.lower():
+            raise ValidationError(f'Part {number} failed its checksum.')
+        os.replace(tmp, part_path(session, number))
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+
+
+def content_name(checksum, filename):
+    """Storage name for a file addressed by its sha256, so identical uploads share one copy."""
+    extension = os.path.splitext(get_valid_filename(filename))[1].lower()[:16]
+    return f'submissions/sha256/{checksum[:2]}/{checksum}{extension}'
+
+
+def check_complete(session):
+    missing = sorted(set(range(session.parts)) - set(received_parts(session)))
+    if missing:
+        raise ValidationError({'missing_parts': missing})
+
+
+def assemble(session):
+    """
+    Concatenate the parts into their content-addressed location, hashing as
+    they are copied. Returns the storage name. If the same content is already
+    stored, the assembled copy is dropped and the existing file reused. The
+    parts are kept until the caller discards them, so a retry can start over.
+    """
+    check_complete(session)
+    assembled = os.path.join(session_dir(session), 'assembled')
+    digest = hashlib.sha256()
+    with open(assembled, 'wb') as out:
+        for number in range(session.parts):
+            with open(part_path(session, number), 'rb') as part:
+                while chunk := part.read(READ_SIZE):
+                    digest.update(chunk)
+                    out.write(chunk)
+    if digest.hexdigest() != session.checksum:
+        # No way to tell which part is bad; the client starts over
+        discard(session)
+        raise ValidationError('Checksum mismatch; upload the file again.')
+
+    name = content_name(session.checksum, session.filename)
+    target = default_storage.path(name)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(assembled, target)
+    return name
+
+
+def finish(upload_id):
+    """
+    Background half of completing an upload: assemble it and create the
+    Submission. Returns the submission, or None if the session was not
+    waiting to be assembled (already done, failed or purged).
+    """
+    session = UploadSession.objects.filter(pk=upload_id, status=UploadSession.ASSEMBLING).first()
+    if session is None: return None
+    try:
+        name = assemble(session)
+    except ValidationError as error:
+        message = ' '.join(map(str, error.detail)) if isinstance(error.detail, list) else str(error.detail)
+        UploadSession.objects.filter(pk=session.pk).update(status=UploadSession.FAILED, error=message[:255])
+        discard(session)
+        return None
+    with transaction.atomic():
+        submission = Submission.objects.create(
+            assignment_id=session.assignment_id, student_id=session.user_id, file=name, checksum=session.checksum
+        )
+        UploadSession.objects.filter(pk=session.pk).update(status=UploadSession.DONE, submission=submission)
+    discard(session)
+    return submission
+
+
+def discard(session):
+    shutil.rmtree(session_dir(session), ignore_errors=True)
+
+
+def purge_stale(hours=None):
+    """Delete upload sessions (and their parts) that were never completed."""
+    cutoff = timezone.now() - timedelta(hours=hours or settings.UPLOAD_SESSION_HOURS)
+    stale = list(UploadSession.objects.filter(created_at__lt=cutoff))
+    for session in stale:
+        discard(session)
+    UploadSession.objects.filter(pk__in=[session.pk for session in stale]).delete()
+    return len(stale)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
@@ -5,7 +6,7 @@ from .views import (
     UserViewSet, RoleViewSet, CourseViewSet, ModuleViewSet, 
     LessonViewSet, EnrollmentViewSet, AssignmentViewSet, 
     SubmissionViewSet, QuizViewSet, ResultViewSet, LessonCompletionViewSet,
-    AnnouncementViewSet, CommentViewSet, CertificateViewSet
+    AnnouncementViewSet, CommentViewSet, CertificateViewSet, SearchView, cache_stats, sync, events_ticket
 )
 
 router = DefaultRouter()
@@ -28,4 +29,18 @@ urlpatterns = [
     path('', include(router.urls)),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('cache-stats/', cache_stats, name='cache_stats'),
+    path('sync/', sync, name='sync'),
+    path('events/ticket/', events_ticket, name='events-ticket'),
 ]
+
+if settings.ASYNC_VIEWS:
+    from . import async_views
+    urlpatterns[:0] = [
+        path('courses/catalog/', async_views.course_catalog),
+        path('lessons/<int:pk>/', async_views.lesson_detail),
+        path('users/me/', async_views.users_me),
+        path('certificates/', async_views.certificate_list),
+        path('events/', async_views.event_stream, name='events'),
+    ]
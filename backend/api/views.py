@@ -1,22 +1,43 @@
-from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import action
+from rest_framework import generics, viewsets, permissions, status
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from .models import User, Role, Course, Module, Lesson, Enrollment, Assignment, Submission, Quiz, Result, LessonCompletion, Announcement, Comment, Certificate
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.db.models import Prefetch, Q
+from .models import User, Role, Course, Module, Lesson, Enrollment, Assignment, Submission, Quiz, Result, LessonCompletion, Announcement, Comment, Certificate, UploadSession, SearchDocument
 from .serializers import (
-    UserSerializer, RoleSerializer, CourseSerializer, ModuleSerializer, 
+    UserSerializer, RoleSerializer, CourseSerializer, CourseSummarySerializer, ModuleSerializer, 
     LessonSerializer, EnrollmentSerializer, AssignmentSerializer, 
     SubmissionSerializer, QuizSerializer, ResultSerializer, 
-    LessonCompletionSerializer, AnnouncementSerializer, CommentSerializer, CertificateSerializer
+    LessonCompletionSerializer, AnnouncementSerializer, CommentSerializer, CertificateSerializer,
+    BulkLessonCompletionSerializer, BulkGradeSerializer, QuizSubmissionSerializer, QuizBatchSerializer,
+    UploadSessionSerializer, SearchResultSerializer, BulkEnrollmentSerializer,
 )
+from .pagination import TotalCountPagination
+from .prefetch import with_prefetch_plan
+from . import exports, roster, search, uploads
+from .downloads import serve_protected
+from .grading import get_answer_key
+from .cache import VersionedCacheMixin, stats as cache_stats_snapshot
+from .counters import recount_enrollments
+from .tasks import enqueue
+from .jobs import assemble_upload, evaluate_course_completion, refresh_grade_rollup
+from .analytics import course_report
+from .sync import DeltaSyncMixin, sync_all
+from .events import issue_ticket
 
 class RoleViewSet(viewsets.ModelViewSet):
     queryset = Role.objects.all()
     serializer_class = RoleSerializer
+    cursor_ordering = ('name', 'id')
     permission_classes = [permissions.IsAdminUser]
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    cursor_ordering = ('-date_joined', '-id')
 
     def get_permissions(self):
         if self.action == 'create': return [permissions.AllowAny()]
@@ -27,14 +48,57 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(request.user)
         return Response(serializer.data)
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(VersionedCacheMixin, viewsets.ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    cursor_ordering = ('-created_at', '-id')
+    cache_kind = 'course'
+    content_version_path = 'content_version'
     
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']: return [permissions.AllowAny()]
+        if self.action in ['list', 'retrieve', 'catalog']: return [permissions.AllowAny()]
         return [permissions.IsAuthenticated()]
 
+    def is_summary(self):
+        if self.action == 'catalog': return True
+        return self.action in ['list', 'retrieve'] and self.request.query_params.get('view') == 'summary'
+
+    def get_serializer_class(self):
+        if self.is_summary(): return CourseSummarySerializer
+        return CourseSerializer
+
+    def get_queryset(self):
+        queryset = Course.objects.all()
+        return with_prefetch_plan(queryset, self.get_serializer_class(), context=self.get_serializer_context())
+
+    @action(detail=False, methods=['get'])
+    def catalog(self, request):
+        return self.list(request)
+
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, pk=None):
+        """Enrollment trend, completion funnel, quiz averages and grade distributions from the rollup tables."""
+        course = Course.objects.filter(pk=pk).values('id', 'instructor_id').first()
+        if course is None: raise NotFound()
+        if course['instructor_id'] != request.user.pk and not request.user.is_staff:
+            return Response({"detail": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
+        return Response(course_report(course['id']))
+
+    @action(detail=True, methods=['get'], url_path='export/(?P<dataset>submissions|results|progress)')
+    def export(self, request, pk=None, dataset=None):
+        """Stream a course's grades, quiz results or lesson progress as CSV (default) or ?output=jsonl."""
+        course = Course.objects.filter(pk=pk).values('id', 'instructor_id').first()
+        if course is None: raise NotFound()
+        if course['instructor_id'] != request.user.pk and not request.user.is_staff:
+            return Response({"detail": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
+        output = request.query_params.get('output', 'csv')
+        if output not in exports.FORMATS:
+            return Response({"detail": "output must be csv or jsonl"}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(exports.stream(dataset, course['id'], output), content_type=exports.FORMATS[output])
+        response['Content-Disposition'] = f'attachment; filename="course-{pk}-{dataset}.{output}"'
+        return response
+
     def perform_create(self, serializer):
         serializer.save(instructor=self.request.user)
 
@@ -44,15 +108,22 @@ class CourseViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
         return super().destroy(request, *args, **kwargs)
 
-class AnnouncementViewSet(viewsets.ModelViewSet):
+class AnnouncementViewSet(DeltaSyncMixin, viewsets.ModelViewSet):
     queryset = Announcement.objects.all()
     serializer_class = AnnouncementSerializer
+    cursor_ordering = ('-created_at', '-id')
     permission_classes = [permissions.IsAuthenticated]
+    sync_feed = 'announcements'
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(DeltaSyncMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
+    cursor_ordering = ('-created_at', '-id')
     permission_classes = [permissions.IsAuthenticated]
+    sync_feed = 'comments'
+
+    def get_queryset(self):
+        return with_prefetch_plan(Comment.objects.all(), self.get_serializer_class(), context=self.get_serializer_context())
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -60,74 +131,377 @@ class CommentViewSet(viewsets.ModelViewSet):
 class CertificateViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Certificate.objects.all()
     serializer_class = CertificateSerializer
+    cursor_ordering = ('-issued_at', '-id')
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Certificate.objects.filter(student=self.request.user)
+        return with_prefetch_plan(Certificate.objects.filter(student=self.request.user), self.get_serializer_class())
 
-class ModuleViewSet(viewsets.ModelViewSet):
+class ModuleViewSet(VersionedCacheMixin, viewsets.ModelViewSet):
     queryset = Module.objects.all()
     serializer_class = ModuleSerializer
+    cursor_ordering = ('order', 'id')
     permission_classes = [permissions.IsAuthenticated]
+    cache_kind = 'module'
+    content_version_path = 'course__content_version'
+
+    def get_queryset(self):
+        return with_prefetch_plan(Module.objects.all(), self.get_serializer_class(), context=self.get_serializer_context())
+
+COMMENT_PREVIEW_LIMIT = 20
+
 
-class LessonViewSet(viewsets.ModelViewSet):
+def comment_preview_size(request):
+    """?comments=N asks for the N newest comments with each lesson, at most COMMENT_PREVIEW_LIMIT."""
+    try:
+        return max(0, min(int(request.query_params.get('comments', 0)), COMMENT_PREVIEW_LIMIT))
+    except ValueError:
+        return 0
+
+
+def with_comment_preview(queryset, size):
+    if not size: return queryset
+    # A sliced Prefetch runs one windowed query for all lessons
+    latest = Comment.objects.select_related('user').order_by('-created_at', '-id')[:size]
+    return queryset.prefetch_related(Prefetch('comments', queryset=latest, to_attr='latest_comments'))
+
+
+class LessonViewSet(VersionedCacheMixin, viewsets.ModelViewSet):
     queryset = Lesson.objects.all()
     serializer_class = LessonSerializer
+    cursor_ordering = ('order', 'id')
     permission_classes = [permissions.IsAuthenticated]
+    cache_kind = 'lesson'
+    content_version_path = 'module__course__content_version'
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'comment_preview': comment_preview_size(self.request)}
 
-class EnrollmentViewSet(viewsets.ModelViewSet):
+    def get_queryset(self):
+        queryset = with_prefetch_plan(Lesson.objects.all(), self.get_serializer_class(), context=self.get_serializer_context())
+        return with_comment_preview(queryset, comment_preview_size(self.request))
+
+    @action(detail=True, methods=['get'])
+    def comments(self, request, pk=None):
+        """The lesson's discussion thread, newest first, keyset-paginated."""
+        lesson = self.get_object()
+        self.cursor_ordering = ('-created_at', '-id')
+        queryset = with_prefetch_plan(Comment.objects.filter(lesson=lesson), CommentSerializer, context={'request': request})
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(CommentSerializer(page, many=True, context={'request': request}).data)
+
+class EnrollmentViewSet(DeltaSyncMixin, viewsets.ModelViewSet):
     queryset = Enrollment.objects.all()
     serializer_class = EnrollmentSerializer
+    cursor_ordering = ('-enrolled_at', '-id')
     permission_classes = [permissions.IsAuthenticated]
+    sync_feed = 'enrollments'
 
     def get_queryset(self):
-        if self.request.user.is_staff: return Enrollment.objects.all()
-        return Enrollment.objects.filter(student=self.request.user)
+        queryset = Enrollment.objects.select_related('course__instructor')
+        if self.request.user.is_staff: return queryset
+        return queryset.filter(student=self.request.user)
+
+    def get_tombstones(self):
+        tombstones = super().get_tombstones()
+        if self.request.user.is_staff: return tombstones
+        return tombstones.filter(owner_id=self.request.user.pk)
 
     def perform_create(self, serializer):
         serializer.save(student=self.request.user)
 
-class LessonCompletionViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Enroll many existing students in a course at once (its instructor or an admin only)."""
+        serializer = BulkEnrollmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        instructor = Course.objects.filter(pk=data['course']).values_list('instructor_id', flat=True).first()
+        if instructor is None: raise NotFound('Course not found.')
+        if instructor != request.user.pk and not request.user.is_staff:
+            return Response({"detail": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
+
+        rows = ([{'id': pk} for pk in data.get('students', [])] + [{'username': name} for name in data.get('usernames', [])]
+                + [{'email': email} for email in data.get('emails', [])])
+        return Response(roster.import_roster(rows, course_id=data['course']))
+
+class LessonCompletionViewSet(DeltaSyncMixin, viewsets.ModelViewSet):
     queryset = LessonCompletion.objects.all()
     serializer_class = LessonCompletionSerializer
+    cursor_ordering = ('-completed_at', '-id')
     permission_classes = [permissions.IsAuthenticated]
+    sync_feed = 'lesson-completions'
 
     def get_queryset(self):
         return LessonCompletion.objects.filter(student=self.request.user)
 
+    def get_tombstones(self):
+        return super().get_tombstones().filter(owner_id=self.request.user.pk)
+
     def perform_create(self, serializer):
-        serializer.save(student=self.request.user)
-        # Check for course completion to issue certificate
-        lesson = serializer.validated_data['lesson']
-        course = lesson.module.course
-        total = Lesson.objects.filter(module__course=course).count()
-        done = LessonCompletion.objects.filter(student=self.request.user, lesson__module__course=course).count()
-        if total > 0 and done >= total:
-            import secrets
-            random_id = secrets.token_hex(4).upper() # 8 characters
-            Certificate.objects.get_or_create(
-                student=self.request.user, 
-                course=course,
-                defaults={'certificate_id': f"SLMS-{random_id}"}
+        completion = serializer.save(student=self.request.user)
+        # Course completion and certificate issuance run in the background
+        enqueue(evaluate_course_completion, key=f'course-completion:{completion.student_id}:{completion.lesson_id}',
+                student_id=completion.student_id, lesson_id=completion.lesson_id)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Mark many lessons complete at once, e.g. when an offline client syncs."""
+        serializer = BulkLessonCompletionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lesson_ids = list(dict.fromkeys(serializer.validated_data['lessons']))
+        student = request.user
+
+        courses = dict(Lesson.objects.filter(pk__in=lesson_ids).values_list('id', 'module__course_id'))
+
+        with transaction.atomic():
+            # Lock the student's row so concurrent syncs of one student run one after another and
+            # each lesson is reported created, and evaluated, by exactly one of them
+            list(User.objects.select_for_update().filter(pk=student.pk).values_list('pk', flat=True))
+            completions = LessonCompletion.objects.filter(student=student)
+            existing = set(completions.filter(lesson_id__in=courses).values_list('lesson_id', flat=True))
+            new_ids = [pk for pk in lesson_ids if pk in courses and pk not in existing]
+            LessonCompletion.objects.bulk_create(
+                [LessonCompletion(student=student, lesson_id=pk) for pk in new_ids],
+                batch_size=500, ignore_conflicts=True,
             )
+            created = set(completions.filter(lesson_id__in=new_ids).values_list('lesson_id', flat=True))
+            # bulk_create skips the signal handlers, so refresh the touched counters in one pass
+            touched = {courses[pk]: pk for pk in lesson_ids if pk in created}
+            if touched:
+                recount_enrollments(Enrollment.objects.filter(student=student, course_id__in=touched))
+            for lesson_id in touched.values():
+                enqueue(evaluate_course_completion, key=f'course-completion:{student.pk}:{lesson_id}',
+                        student_id=student.pk, lesson_id=lesson_id)
+
+        results = [
+            {'lesson': pk, 'status': 'created' if pk in created else 'exists' if pk in existing else 'not_found'}
+            for pk in lesson_ids
+        ]
+        return Response({'results': results})
 
 # Add other viewsets (Assignment, Submission, Quiz, Result) as simple ModelViewSets
 class AssignmentViewSet(viewsets.ModelViewSet):
     queryset = Assignment.objects.all()
     serializer_class = AssignmentSerializer
+    cursor_ordering = ('due_date', 'id')
     permission_classes = [permissions.IsAuthenticated]
 
 class SubmissionViewSet(viewsets.ModelViewSet):
     queryset = Submission.objects.all()
     serializer_class = SubmissionSerializer
+    cursor_ordering = ('-submitted_at', '-id')
     permission_classes = [permissions.IsAuthenticated]
 
+    @action(detail=False, methods=['post'], url_path='bulk-grade')
+    def bulk_grade(self, request):
+        """Grade many submissions in one transaction, keyed by submission id or by student within an assignment."""
+        serializer = BulkGradeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        assignment_id = serializer.validated_data.get('assignment')
+        items = serializer.validated_data['grades']
+
+        ids = [item['id'] for item in items if 'id' in item]
+        students = [item['student'] for item in items if 'id' not in item]
+        queryset = Submission.objects.select_related('assignment__module__course').only(
+            'id', 'student_id', 'assignment_id', 'grade', 'feedback', 'assignment__module__course__instructor_id'
+        )
+        by_id = {sub.pk: sub for sub in queryset.filter(pk__in=ids)}
+        by_student = {}
+        if students:
+            # A student may have resubmitted; grade the latest attempt
+            for sub in queryset.filter(assignment_id=assignment_id, student_id__in=students).order_by('submitted_at', 'id'):
+                by_student[sub.student_id] = sub
+
+        results, changed = [], {}
+        for item in items:
+            key = {'id': item['id']} if 'id' in item else {'student': item['student']}
+            sub = by_id.get(item['id']) if 'id' in item else by_student.get(item['student'])
+            if sub is None:
+                results.append({**key, 'status': 'not_found'})
+            elif sub.assignment.module.course.instructor_id != request.user.pk and not request.user.is_staff:
+                results.append({**key, 'status': 'forbidden'})
+            else:
+                sub.grade = item['grade']
+                if 'feedback' in item: sub.feedback = item['feedback']
+                changed[sub.pk] = sub
+                results.append({**key, 'id': sub.pk, 'status': 'graded'})
+
+        with transaction.atomic():
+            Submission.objects.bulk_update(list(changed.values()), ['grade', 'feedback'], batch_size=500)
+            for assignment_id in {sub.assignment_id for sub in changed.values()}:
+                enqueue(refresh_grade_rollup, key=f'grade-rollup:{assignment_id}', assignment_id=assignment_id)
+        return Response({'results': results})
+
+    def perform_create(self, serializer):
+        submission = serializer.save()
+        enqueue(refresh_grade_rollup, key=f'grade-rollup:{submission.assignment_id}', assignment_id=submission.assignment_id)
+
+    def perform_update(self, serializer):
+        submission = serializer.save()
+        enqueue(refresh_grade_rollup, key=f'grade-rollup:{submission.assignment_id}', assignment_id=submission.assignment_id)
+
+    def perform_destroy(self, instance):
+        assignment_id = instance.assignment_id
+        instance.delete()
+        enqueue(refresh_grade_rollup, key=f'grade-rollup:{assignment_id}', assignment_id=assignment_id)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """The submitted file, for its student, the course instructor or staff."""
+        submission = Submission.objects.select_related('assignment__module__course').only(
+            'id', 'file', 'student_id', 'assignment__module__course__instructor_id'
+        ).filter(pk=pk).first()
+        if submission is None or not submission.file: raise NotFound()
+        if request.user.pk not in (submission.student_id, submission.assignment.module.course.instructor_id) \
+                and not request.user.is_staff:
+            return Response({"detail": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
+        return serve_protected(request, submission.file)
+
+    # Chunked uploads: POST uploads/ opens a session, PUT uploads/<id>/parts/<n>/
+    # streams each part (raw body) to disk, POST uploads/<id>/complete/ queues a
+    # task that verifies the sha256 and creates the Submission (answers 202; poll
+    # GET uploads/<id>/ until status is done or failed). GET uploads/<id>/ also
+    # lists the parts already received so an interrupted upload can resume.
+
+    def upload_session(self, upload_id):
+        session = UploadSession.objects.filter(pk=upload_id, user=self.request.user).first()
+        if session is None: raise NotFound()
+        return session
+
+    @action(detail=False, methods=['post'], url_path='uploads')
+    def start_upload(self, request):
+        serializer = UploadSessionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        course_id = serializer.validated_data['assignment'].module.course_id
+        if not Enrollment.objects.filter(student=request.user, course_id=course_id).exists():
+            return Response({"detail": "Enroll in the course to submit."}, status=status.HTTP_403_FORBIDDEN)
+        session = serializer.save(user=request.user, part_size=settings.UPLOAD_PART_SIZE)
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get', 'delete'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]{36})')
+    def upload(self, request, upload_id=None):
+        session = self.upload_session(upload_id)
+        if request.method == 'DELETE':
+            uploads.discard(session)
+            session.delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(UploadSessionSerializer(session).data)
+
+    @action(detail=False, methods=['put'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]{36})/parts/(?P<number>\d+)')
+    def upload_part(self, request, upload_id=None, number=None):
+        session = self.upload_session(upload_id)
+        # Read the raw body stream; touching request.data would buffer it
+        uploads.write_part(session, int(number), request.stream, request.headers.get('X-Part-Checksum'))
+        return Response({'part': int(number), 'received_parts': uploads.received_parts(session)})
+
+    @action(detail=False, methods=['post'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]{36})/complete')
+    def complete_upload(self, request, upload_id=None):
+        session = self.upload_session(upload_id)
+        if session.status == UploadSession.RECEIVING:
+            uploads.check_complete(session)
+            # The conditional update makes a repeated complete call queue the task only once
+            if UploadSession.objects.filter(pk=session.pk, status=UploadSession.RECEIVING).update(status=UploadSession.ASSEMBLING):
+                enqueue(assemble_upload, key=f'upload:{session.pk}', upload_id=str(session.pk))
+            session.refresh_from_db()
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_202_ACCEPTED)
+
 class QuizViewSet(viewsets.ModelViewSet):
-    queryset = Quiz.objects.all()
+    queryset = Quiz.objects.select_related('module__course')
     serializer_class = QuizSerializer
+    cursor_ordering = ('-id',)
     permission_classes = [permissions.IsAuthenticated]
 
-class ResultViewSet(viewsets.ModelViewSet):
+    def quiz_info(self):
+        """(version, course id, instructor id) without loading the questions JSON."""
+        row = Quiz.objects.filter(pk=self.kwargs['pk']).values_list(
+            'version', 'module__course_id', 'module__course__instructor_id'
+        ).first()
+        if row is None: raise NotFound()
+        return row
+
+    def answer_key(self, version):
+        key = get_answer_key(int(self.kwargs['pk']), version)
+        if not key.entries:
+            raise ValidationError({'detail': 'This quiz has no gradable questions.'})
+        return key
+
+    @action(detail=True, methods=['post'])
+    def submit(self, request, pk=None):
+        """Score the caller's answers against the compiled answer key and record a Result."""
+        serializer = QuizSubmissionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        version, course_id, instructor_id = self.quiz_info()
+        if not Enrollment.objects.filter(student=request.user, course_id=course_id).exists() \
+                and request.user.pk != instructor_id and not request.user.is_staff:
+            return Response({"detail": "Enroll in the course to take this quiz."}, status=status.HTTP_403_FORBIDDEN)
+
+        score, marks = self.answer_key(version).score(serializer.validated_data['answers'])
+        result = Result.objects.create(quiz_id=pk, student=request.user, score=score)
+        return Response({'id': result.pk, 'score': score, 'correct': marks}, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], url_path='grade-batch')
+    def grade_batch(self, request, pk=None):
+        """Score many attempts at once (e.g. an exam collected offline) and bulk insert the Results."""
+        version, course_id, instructor_id = self.quiz_info()
+        if request.user.pk != instructor_id and not request.user.is_staff:
+            return Response({"detail": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
+        serializer = QuizBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        key = self.answer_key(version)
+        results, scores = [], []
+        for attempt in serializer.validated_data['attempts']:
+            score, _ = key.score(attempt['answers'])
+            results.append(Result(quiz_id=pk, student=attempt['student'], score=score))
+            scores.append({'student': attempt['student'].pk, 'score': score})
+        with transaction.atomic():
+            Result.objects.bulk_create(results, batch_size=500)
+        return Response({'results': scores}, status=status.HTTP_201_CREATED)
+
+class ResultViewSet(viewsets.ReadOnlyModelViewSet):
+    # Results are written by QuizViewSet.submit/grade_batch, never with a client-supplied score
     queryset = Result.objects.all()
     serializer_class = ResultSerializer
+    cursor_ordering = ('-attempted_at', '-id')
     permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        if self.request.user.is_staff: return Result.objects.all()
+        return Result.objects.filter(Q(student=self.request.user) | Q(quiz__module__course__instructor=self.request.user))
+
+class SearchView(generics.ListAPIView):
+    """
+    Ranked full-text search: ?q=words&category=Programming&type=course,lesson,comment.
+    Anonymous visitors search the course catalog only. Numbered pages (?page=N).
+    """
+    serializer_class = SearchResultSerializer
+    pagination_class = TotalCountPagination
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        params = self.request.query_params
+        kinds = {kind for kind in params.get('type', '').split(',') if kind}
+        if not self.request.user.is_authenticated: kinds = {SearchDocument.COURSE}
+        return search.search(params.get('q', ''), category=params.get('category'), kinds=kinds)
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'query': self.request.query_params.get('q', '')}
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def cache_stats(request):
+    return Response(cache_stats_snapshot())
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def sync(request):
+    """Changes to every delta-sync feed since ?since=<cursor>, in one round trip."""
+    viewsets = [EnrollmentViewSet, LessonCompletionViewSet, AnnouncementViewSet, CommentViewSet]
+    return Response(sync_all(request, viewsets, request.query_params.get('since', '')))
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def events_ticket(request):
+    """A single-use ticket for opening /api/events/?ticket= (EventSource cannot send the Authorization header)."""
+    return Response({'ticket': issue_ticket(request.user)}, status=status.HTTP_201_CREATED)
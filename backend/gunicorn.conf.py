@@ -0,0 +1,22 @@
+import os
+
+# SERVER_MODE=asgi runs uvicorn workers on smartlms.asgi, which also routes the
+# read-heavy endpoints to their async views. Worker count comes from WEB_CONCURRENCY.
+bind = '0.0.0.0:8000'
+accesslog = '-'
+errorlog = '-'
+timeout = 120
+
+if os.environ.get('SERVER_MODE', 'wsgi') == 'asgi':
+    wsgi_app = 'smartlms.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'smartlms.wsgi:application'
+
+
+def on_starting(server):
+    # Metric snapshots from a previous run would be added to this run's totals
+    directory = os.environ.get('METRICS_DIR')
+    if directory and os.path.isdir(directory):
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
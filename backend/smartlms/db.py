@@ -0,0 +1,79 @@
+import contextvars
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+REPLICA = 'replica'
+PIN_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Read from the primary even during replica-routed requests: the task queue claims
+# rows with SELECT ... FOR UPDATE, and sessions/cache entries must never be stale.
+PRIMARY_ONLY = {'api.task', 'sessions.session', 'django_cache.cacheentry'}
+
+# Whether the current request may read from the replica. Off outside requests
+# (management commands, task workers) and after the request writes anything.
+replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if replica_reads.get() and model._meta.label_lower not in PRIMARY_ONLY:
+            return REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        # Read-your-writes within the request: everything after a write goes to the primary
+        replica_reads.set(False)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == 'default'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets safe requests read from the replica. A write request pins its client
+    to the primary for DB_REPLICA_PIN_SECONDS (longer than the replication
+    lag) through a cookie, so a POST followed by a GET sees its own write.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = settings.DB_REPLICA_PIN_SECONDS
+        if iscoroutinefunction(get_response): markcoroutinefunction(self)
+
+    def use_replica(self, request):
+        if request.method not in SAFE_METHODS: return False
+        try:
+            return float(request.COOKIES.get(PIN_COOKIE, 0)) < time.time()
+        except ValueError:
+            return True
+
+    def pin(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(PIN_COOKIE, f'{time.time() + self.pin_seconds:.0f}', max_age=self.pin_seconds,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self): return self.__acall__(request)
+        token = replica_reads.set(self.use_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        token = replica_reads.set(self.use_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+        return self.pin(request, response)
@@ -0,0 +1,194 @@
+import contextvars
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class RequestStats:
+    """What one request spent on SQL and serialization. Lives in a context variable."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.templates = Counter()
+        self._depth = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            # Django SQL is already parametrized, so the text is the template
+            self.templates[sql] += 1
+
+
+current = contextvars.ContextVar('request_stats', default=None)
+
+
+def record_current_query(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every DB connection. Counts the query
+    against the request in the current context, if any; contexts follow
+    sync_to_async, so ORM calls made from async views are counted too.
+    """
+    stats = current.get()
+    if stats is None: return execute(sql, params, many, context)
+    return stats.record_query(execute, sql, params, many, context)
+
+
+def attach_query_recorder(connection, **kwargs):
+    if record_current_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_current_query)
+
+
+class serializer_timer:
+    """Adds the time spent in the outermost to_representation() call to the current request."""
+    __slots__ = ('stats', 'start')
+
+    def __enter__(self):
+        self.stats = current.get()
+        if self.stats is not None:
+            if self.stats._depth == 0: self.start = time.perf_counter()
+            self.stats._depth += 1
+
+    def __exit__(self, *exc):
+        if self.stats is not None:
+            self.stats._depth -= 1
+            if self.stats._depth == 0: self.stats.serializer_time += time.perf_counter() - self.start
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = defaultdict(lambda: [[0] * len(buckets), 0, 0.0])
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self.lock:
+            counts, _, _ = series = self.series[labels]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound: counts[i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def items(self):
+        with self.lock:
+            return [(labels, list(counts), total, value_sum) for labels, (counts, total, value_sum) in self.series.items()]
+
+    def render(self, items):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, counts, total, value_sum in sorted(items):
+            label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {total}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {value_sum:.6f}')
+        return lines
+
+
+request_seconds = Histogram('slms_request_duration_seconds', 'Wall time per request.', LATENCY_BUCKETS)
+db_seconds = Histogram('slms_request_db_seconds', 'Time spent executing SQL per request.', LATENCY_BUCKETS)
+serializer_seconds = Histogram('slms_request_serializer_seconds', 'Time spent in serializers per request.', LATENCY_BUCKETS)
+query_count = Histogram('slms_request_queries', 'SQL queries per request.', QUERY_BUCKETS)
+response_bytes = Histogram('slms_response_bytes', 'Response body size.', SIZE_BUCKETS)
+
+HISTOGRAMS = [request_seconds, db_seconds, serializer_seconds, query_count, response_bytes]
+
+
+# Multi-process mode. With METRICS_DIR set, every process writes a snapshot of
+# its histograms to METRICS_DIR/<pid>.json (at most every METRICS_FLUSH_SECONDS,
+# from a background thread) and /metrics sums the snapshots of all of them, so
+# any worker answers with the totals. Snapshots of workers that exited stay, so
+# the counters never go backwards; gunicorn clears the directory when it starts.
+
+_flusher_pid = None
+_dirty = threading.Event()
+
+
+def snapshot_path(pid=None):
+    return os.path.join(settings.METRICS_DIR, f'{pid or os.getpid()}.json')
+
+
+def flush():
+    _dirty.clear()
+    data = {histogram.name: histogram.items() for histogram in HISTOGRAMS}
+    fd, tmp = tempfile.mkstemp(dir=settings.METRICS_DIR, suffix='.tmp')
+    with os.fdopen(fd, 'w') as out:
+        json.dump(data, out)
+    os.replace(tmp, snapshot_path())
+
+
+def _flush_loop():
+    while True:
+        _dirty.wait()
+        time.sleep(settings.METRICS_FLUSH_SECONDS)
+        try:
+            flush()
+        except OSError:
+            pass  # the directory was cleared under us; the next observation writes again
+
+
+def _start_flusher():
+    global _flusher_pid
+    if _flusher_pid == os.getpid(): return
+    _flusher_pid = os.getpid()  # threads do not survive fork, so each worker starts its own
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True).start()
+
+
+def aggregated():
+    """{histogram name: items} summed over every process's snapshot, or this process's alone."""
+    if not settings.METRICS_DIR: return {histogram.name: histogram.items() for histogram in HISTOGRAMS}
+    flush()
+    merged = {histogram.name: {} for histogram in HISTOGRAMS}
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+        try:
+            with open(path) as handle: data = json.load(handle)
+        except (OSError, ValueError):
+            continue
+        for name, items in data.items():
+            if name not in merged: continue
+            for labels, counts, total, value_sum in items:
+                key = tuple(map(tuple, labels))
+                series = merged[name].setdefault(key, [[0] * len(counts), 0, 0.0])
+                series[0] = [a + b for a, b in zip(series[0], counts)]
+                series[1] += total
+                series[2] += value_sum
+    return {name: [(labels, *series) for labels, series in items.items()] for name, items in merged.items()}
+
+
+def observe(route, method, status, stats, duration, size):
+    if settings.METRICS_DIR:
+        _start_flusher()
+        _dirty.set()
+    labels = (('method', method), ('route', route), ('status', str(status)))
+    request_seconds.observe(labels, duration)
+    db_seconds.observe(labels, stats.db_time)
+    serializer_seconds.observe(labels, stats.serializer_time)
+    query_count.observe(labels, stats.queries)
+    if size is not None: response_bytes.observe(labels, size)
+
+
+def render():
+    """Prometheus text exposition of the histograms (of all processes in multi-process mode)."""
+    items = aggregated()
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render(items[histogram.name]))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,81 @@
+import hmac
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+
+from . import metrics
+
+logger = logging.getLogger('smartlms.metrics')
+
+connection_created.connect(metrics.attach_query_recorder)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records per-request SQL count and time, serializer time and response size.
+    Sends them back as a Server-Timing header, aggregates them into per-route
+    histograms for the Prometheus endpoint, and logs likely N+1 patterns
+    (one SQL template repeated many times in a single request).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'N_PLUS_ONE_THRESHOLD', 10)
+        if iscoroutinefunction(get_response): markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self): return self.__acall__(request)
+        # Connections opened before this module was imported missed connection_created
+        for connection in connections.all(initialized_only=True):
+            metrics.attach_query_recorder(connection)
+        stats = metrics.RequestStats()
+        token = metrics.current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        stats = metrics.RequestStats()
+        token = metrics.current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - start)
+
+    def finish(self, request, response, stats, duration):
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        size = None if response.streaming else len(response.content)
+        metrics.observe(route, request.method, response.status_code, stats, duration, size)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"',
+            f'ser;dur={stats.serializer_time * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ])
+
+        repeated = [(sql, n) for sql, n in stats.templates.items() if n >= self.threshold]
+        for sql, n in repeated:
+            logger.warning('Possible N+1 in %s %s (%s): %d x %s', request.method, request.path, route, n, sql[:300])
+        return response
+
+
+def metrics_view(request):
+    if not settings.METRICS_TOKEN:
+        if not settings.DEBUG: raise Http404
+    elif not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {settings.METRICS_TOKEN}'.encode()):
+        return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
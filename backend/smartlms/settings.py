@@ -1,3 +1,4 @@
+import importlib.util
 import os
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -29,6 +30,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'smartlms.middleware.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -39,6 +41,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Request metrics: log a warning when one SQL statement repeats this often in a request
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', '10'))
+# With several worker processes, set METRICS_DIR to a directory they share (and
+# only they use) so /metrics reports the sum over all of them (smartlms/metrics.py).
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', '1'))
+# /metrics answers only requests carrying "Authorization: Bearer <METRICS_TOKEN>"
+# (Prometheus: authorization.credentials); with no token it is open only when DEBUG.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 ROOT_URLCONF = 'smartlms.urls'
 
 TEMPLATES = [
@@ -59,16 +71,77 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'smartlms.wsgi.application'
 
-# Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': os.environ.get('DB_NAME', 'lms_db'),
-        'USER': os.environ.get('DB_USER', 'lms_user'),
-        'PASSWORD': os.environ.get('DB_PASSWORD', 'lms_pass'),
-        'HOST': os.environ.get('DB_HOST', 'localhost'),
-        'PORT': os.environ.get('DB_PORT', '3306'),
+# Database. Connections persist for DB_CONN_MAX_AGE seconds (checked before reuse);
+# DB_POOL_SIZE > 0 switches MySQL to a pooled backend (pip install django-db-connection-pool[mysql]).
+# Under ASGI (SERVER_MODE=asgi, or ASYNC_VIEWS, which smartlms/asgi.py sets) persistent
+# connections are per thread and are not reused safely, so they are closed after every
+# request there; set DB_POOL_SIZE to reuse connections on ASGI workers.
+# Setting DB_REPLICA_HOST (or DB_REPLICA_NAME) adds a read replica: safe requests read from it,
+# writes go to the primary. DB_REPLICA_* variables default to the primary's DB_* values.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'mysql')
+DB_ASGI = os.environ.get('SERVER_MODE') == 'asgi' or os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+DB_CONN_MAX_AGE = 0 if DB_ASGI else int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '0'))
+DB_POOL_OVERFLOW = int(os.environ.get('DB_POOL_OVERFLOW', '10'))
+DB_REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', '5'))
+DB_ENGINES = {
+    'mysql': 'django.db.backends.mysql',
+    'sqlite': 'django.db.backends.sqlite3',
+}
+
+
+def database(prefix):
+    def env(key, default):
+        return os.environ.get(f'{prefix}_{key}', os.environ.get(f'DB_{key}', default))
+    config = {
+        'ENGINE': DB_ENGINES[DB_ENGINE],
+        'NAME': env('NAME', os.path.join(BASE_DIR, 'db.sqlite3') if DB_ENGINE == 'sqlite' else 'lms_db'),
+        'USER': env('USER', 'lms_user'),
+        'PASSWORD': env('PASSWORD', 'lms_pass'),
+        'HOST': env('HOST', 'localhost'),
+        'PORT': env('PORT', '3306'),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
     }
+    if DB_POOL_SIZE and DB_ENGINE == 'mysql':
+        # The pool owns connection reuse, so Django closes (returns) them after each request
+        config.update(ENGINE='dj_db_conn_pool.backends.mysql', CONN_MAX_AGE=0, POOL_OPTIONS={
+            'POOL_SIZE': DB_POOL_SIZE, 'MAX_OVERFLOW': DB_POOL_OVERFLOW, 'RECYCLE': 3600, 'PRE_PING': True,
+        })
+    return config
+
+
+DATABASES = {'default': database('DB')}
+if os.environ.get('DB_REPLICA_HOST') or os.environ.get('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {**database('DB_REPLICA'), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_ROUTERS = ['smartlms.db.PrimaryReplicaRouter']
+    MIDDLEWARE.insert(1, 'smartlms.db.ReplicaRoutingMiddleware')
+
+# Background tasks: 'local' runs them on an in-process thread pool, 'db' queues
+# them in the tasks table for `manage.py run_tasks`, 'immediate' runs them inline.
+TASK_BACKEND = os.environ.get('TASK_BACKEND', 'local')
+TASK_WORKERS = int(os.environ.get('TASK_WORKERS', '4'))
+# A 'db' task still running after TASK_LEASE_SECONDS is taken to belong to a dead
+# worker and is retried (tasks must be safe to run twice). run_tasks deletes
+# finished and failed rows after TASK_KEEP_DAYS.
+TASK_LEASE_SECONDS = int(os.environ.get('TASK_LEASE_SECONDS', '600'))
+TASK_KEEP_DAYS = int(os.environ.get('TASK_KEEP_DAYS', '2'))
+
+# Caches. The 'content' cache holds serialized course trees keyed by
+# Course.content_version; CONTENT_CACHE_BACKEND is 'locmem', 'file' or 'db'
+# (the db backend needs `manage.py createcachetable`).
+CONTENT_CACHE_BACKENDS = {
+    'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'content'},
+    'file': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': os.path.join(BASE_DIR, 'cache')},
+    'db': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'content_cache'},
+}
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'content': {
+        **CONTENT_CACHE_BACKENDS[os.environ.get('CONTENT_CACHE_BACKEND', 'locmem')],
+        'TIMEOUT': int(os.environ.get('CONTENT_CACHE_TIMEOUT', '86400')),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
 }
 
 # Password validation
@@ -87,6 +160,32 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing (api/passwords.py). PASSWORD_HASHER picks the scheme for new
+# hashes: 'argon2' (needs argon2-cffi), 'scrypt', 'pbkdf2', or 'auto' (argon2 when
+# installed, else scrypt). The others stay listed so existing hashes still verify;
+# they, and hashes made with older costs, are upgraded at the owner's next login.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'auto')
+if PASSWORD_HASHER == 'auto':
+    PASSWORD_HASHER = 'argon2' if importlib.util.find_spec('argon2') else 'scrypt'
+PASSWORD_HASHER_CLASSES = {
+    'argon2': 'api.passwords.Argon2PasswordHasher',
+    'scrypt': 'api.passwords.ScryptPasswordHasher',
+    'pbkdf2': 'api.passwords.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER
+]
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', '2'))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', '19456'))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', '1'))
+SCRYPT_WORK_FACTOR = int(os.environ.get('SCRYPT_WORK_FACTOR', str(2 ** 14)))
+SCRYPT_BLOCK_SIZE = int(os.environ.get('SCRYPT_BLOCK_SIZE', '8'))
+SCRYPT_PARALLELISM = int(os.environ.get('SCRYPT_PARALLELISM', '1'))
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', '1000000'))
+# Threads used to hash the passwords of a bulk import (import_roster). Logins
+# hash on their request thread; scale them with the number of web workers.
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -102,22 +201,65 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Protected files (submissions) are authorized by Django and, behind nginx, sent by
+# nginx from its internal MEDIA_ACCEL_PREFIX location via X-Accel-Redirect
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT', 'False') == 'True'
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected/')
+
+# Chunked uploads: parts are streamed to MEDIA_ROOT/uploads/ and assembled on completion
+UPLOAD_PART_SIZE = int(os.environ.get('UPLOAD_PART_SIZE', str(8 * 1024 * 1024)))
+UPLOAD_MAX_SIZE = int(os.environ.get('UPLOAD_MAX_SIZE', str(2 * 1024 ** 3)))
+UPLOAD_SESSION_HOURS = int(os.environ.get('UPLOAD_SESSION_HOURS', '24'))
+
+# Route the read-heavy endpoints to their async views (api/async_views.py).
+# smartlms/asgi.py switches this on; under WSGI the sync viewsets serve everything.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+
+# Server-sent events (api/events.py, ASGI only): how often each worker polls for rows
+# other workers created, how far back it looks for late commits, the keepalive
+# interval, how many undelivered events a slow client may have queued and how
+# long a stream ticket stays valid.
+EVENTS_POLL_SECONDS = float(os.environ.get('EVENTS_POLL_SECONDS', '1'))
+EVENTS_SETTLE_SECONDS = int(os.environ.get('EVENTS_SETTLE_SECONDS', '2'))
+EVENTS_HEARTBEAT_SECONDS = int(os.environ.get('EVENTS_HEARTBEAT_SECONDS', '15'))
+EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', '100'))
+EVENTS_RETRY_MS = int(os.environ.get('EVENTS_RETRY_MS', '3000'))
+EVENTS_TICKET_SECONDS = int(os.environ.get('EVENTS_TICKET_SECONDS', '30'))
+
+# Full-text search: 'auto' picks MySQL FULLTEXT or SQLite FTS5 and falls back to
+# the portable SearchTerm index ('terms')
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+
+# Delta sync (see api.sync): rows per feed per response, how far behind "now" the
+# cursor stays to catch late commits, and how long deletions are remembered.
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', '500'))
+SYNC_SETTLE_SECONDS = int(os.environ.get('SYNC_SETTLE_SECONDS', '2'))
+SYNC_TOMBSTONE_DAYS = int(os.environ.get('SYNC_TOMBSTONE_DAYS', '30'))
+
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'TOKEN_OBTAIN_SERIALIZER': 'api.authentication.VersionedTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.authentication.VersionedTokenRefreshSerializer',
 }
 
+# Per-process cache of authenticated users (see api.authentication)
+AUTH_CACHE_SECONDS = int(os.environ.get('AUTH_CACHE_SECONDS', 30))
+AUTH_CACHE_SIZE = int(os.environ.get('AUTH_CACHE_SIZE', 10000))
+
 # CORS
 CORS_ALLOW_ALL_ORIGINS = True
 
@@ -1,9 +1,20 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from django.views.static import serve
+from api.downloads import PROTECTED_PREFIXES
+from .middleware import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Prometheus scrape target (scrape backend:8000 directly; nginx does not proxy it), guarded by METRICS_TOKEN
+    path('metrics', metrics_view, name='metrics'),
+]
+
+if settings.DEBUG:
+    # Public media for local runs; protected files only go through their authorized download endpoints
+    protected = '|'.join(prefix.rstrip('/') for prefix in PROTECTED_PREFIXES)
+    urlpatterns.append(re_path(
+        rf'^{settings.MEDIA_URL.lstrip("/")}(?!(?:{protected})/)(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}
+    ))
@@ -49,4 +49,48 @@ api.interceptors.response.use(
     }
 );
 
+// List endpoints are paginated; follow `next` links to collect every row.
+export const fetchAll = async (url, config) => {
+    let res = await api.get(url, config);
+    if (Array.isArray(res.data)) return res.data;
+    const rows = [...res.data.results];
+    while (res.data.next) {
+        res = await api.get(res.data.next, config);
+        rows.push(...res.data.results);
+    }
+    return rows;
+};
+
+// Live announcements/comments over server-sent events; returns a function that closes the stream.
+// EventSource cannot send headers, so each connection is opened with a fresh single-use ticket.
+export const subscribe = (params, handlers) => {
+    let source = null;
+    let closed = false;
+    let timer = null;
+    const open = async () => {
+        try {
+            const { data } = await api.post('/events/ticket/');
+            if (closed) return;
+            source = new EventSource(`${API_URL}/events/?${new URLSearchParams({ ...params, ticket: data.ticket })}`);
+        } catch (err) {
+            if (!closed) timer = setTimeout(open, 5000);
+            return;
+        }
+        Object.entries(handlers).forEach(([kind, handler]) => {
+            source.addEventListener(kind, (event) => handler(JSON.parse(event.data)));
+        });
+        // The browser's own reconnect reuses the spent ticket and fails; reopen with a new one
+        source.onerror = () => {
+            source.close();
+            if (!closed) timer = setTimeout(open, 3000);
+        };
+    };
+    open();
+    return () => {
+        closed = true;
+        clearTimeout(timer);
+        if (source) source.close();
+    };
+};
+
 export default api;
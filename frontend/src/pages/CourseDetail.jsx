@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import api from '../api';
+import api, { fetchAll, subscribe } from '../api';
 import Navbar from '../components/Navbar';
 import { PlayCircle, Clock, CheckCircle, Lock, ArrowLeft, Users, FileText, MessageSquare, Bell, HelpCircle } from 'lucide-react';
 
@@ -14,24 +14,36 @@ const CourseDetail = () => {
     const [completedLessons, setCompletedLessons] = useState([]);
     const [activeTab, setActiveTab] = useState('content'); // content, announcements, quiz, discussion
     const [newComment, setNewComment] = useState('');
+    // The open lesson's thread, oldest first; `commentsNext` pages further back
+    const [comments, setComments] = useState([]);
+    const [commentsNext, setCommentsNext] = useState(null);
     const role = localStorage.getItem('role');
 
     // ... fetchData logic ...
 
+    // A comment can arrive twice (our own POST and the live stream), so skip known ids
+    const addComment = (comment) => {
+        setComments(current => current.some(c => c.id === comment.id) ? current : [...current, comment]);
+    };
+
+    const loadOlderComments = async () => {
+        const res = await api.get(commentsNext);
+        setComments(current => [...res.data.results.reverse(), ...current]);
+        setCommentsNext(res.data.next);
+    };
+
+    const addAnnouncement = (announcement) => {
+        setCourse(current => (current.announcements || []).some(a => a.id === announcement.id) ? current
+            : { ...current, announcements: [announcement, ...(current.announcements || [])] });
+    };
+
     const handleCommentSubmit = async (e) => {
         e.preventDefault();
         if (!newComment || !activeLesson) return;
         try {
             const res = await api.post('/comments/', { lesson: activeLesson.id, text: newComment });
-            const updatedCourse = { ...course };
             // Update the local state for immediate feedback
-            updatedCourse.modules = updatedCourse.modules.map(m => ({
-                ...m,
-                lessons: m.lessons.map(l => l.id === activeLesson.id ? { ...l, comments: [...(l.comments || []), res.data] } : l)
-            }));
-            setCourse(updatedCourse);
-            // Also update activeLesson if it's the one we're commenting on
-            setActiveLesson({ ...activeLesson, comments: [...(activeLesson.comments || []), res.data] });
+            addComment(res.data);
             setNewComment('');
         } catch (err) {
             alert("Failed to post comment");
@@ -45,17 +57,17 @@ const CourseDetail = () => {
                 setCourse(res.data);
 
                 if (role === 'Student') {
-                    const [enrollRes, completionRes] = await Promise.all([
-                        api.get('/enrollments/'),
-                        api.get('/lesson-completions/')
+                    const [enrollRows, completionRows] = await Promise.all([
+                        fetchAll('/enrollments/'),
+                        fetchAll('/lesson-completions/')
                     ]);
 
-                    const alreadyEnrolled = enrollRes.data.some(e => {
+                    const alreadyEnrolled = enrollRows.some(e => {
                         const courseId = typeof e.course === 'object' ? e.course.id : e.course;
                         return courseId === parseInt(id);
                     });
                     setIsEnrolled(alreadyEnrolled);
-                    setCompletedLessons(completionRes.data.map(c => c.lesson));
+                    setCompletedLessons(completionRows.map(c => c.lesson));
                 }
             } catch (err) {
                 console.error(err);
@@ -66,6 +78,31 @@ const CourseDetail = () => {
         fetchCourse();
     }, [id, role]);
 
+    useEffect(() => {
+        setComments([]);
+        setCommentsNext(null);
+        if (!activeLesson) return undefined;
+        let current = true;
+        api.get(`/lessons/${activeLesson.id}/comments/`).then(res => {
+            if (!current) return;
+            setComments(res.data.results.reverse());
+            setCommentsNext(res.data.next);
+        }).catch(err => console.error(err));
+        return () => { current = false; };
+    }, [activeLesson?.id]);
+
+    // Push new announcements and comments on the open lesson instead of polling
+    const canListen = Boolean(course) && (isEnrolled || (role && role !== 'Student'));
+    const listeningLesson = activeLesson?.id;
+    useEffect(() => {
+        if (!canListen) return undefined;
+        const params = listeningLesson ? { course: id, lesson: listeningLesson } : { course: id };
+        return subscribe(params, {
+            announcement: addAnnouncement,
+            comment: (comment) => comment.lesson === listeningLesson && addComment(comment),
+        });
+    }, [id, canListen, listeningLesson]);
+
     const handleEnroll = async () => {
         if (!role) {
             navigate('/login');
@@ -246,10 +283,13 @@ const CourseDetail = () => {
                                         </form>
 
                                         <div style={{ display: 'flex', flexDirection: 'column', gap: '1rem' }}>
-                                            {activeLesson.comments && activeLesson.comments.length > 0 ? activeLesson.comments.map(comment => (
+                                            {commentsNext && (
+                                                <button className="btn" onClick={loadOlderComments}>Show older comments</button>
+                                            )}
+                                            {comments.length > 0 ? comments.map(comment => (
                                                 <div key={comment.id} className="card" style={{ background: 'var(--primary-light)' }}>
                                                     <div style={{ display: 'flex', justifyContent: 'space-between', marginBottom: '0.5rem' }}>
-                                                        <span style={{ fontWeight: '700', color: 'var(--accent)' }}>{comment.username}</span>
+                                                        <span style={{ fontWeight: '700', color: 'var(--accent)' }}>{comment.author_name}</span>
                                                         <span style={{ fontSize: '0.75rem', color: 'var(--text-muted)' }}>{new Date(comment.created_at).toLocaleString()}</span>
                                                     </div>
                                                     <p style={{ fontSize: '0.9rem' }}>{comment.text}</p>
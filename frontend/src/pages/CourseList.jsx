@@ -1,9 +1,12 @@
 import React, { useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
-import api from '../api';
+import api, { fetchAll } from '../api';
 import Navbar from '../components/Navbar';
 import { BookOpen, Users, Award, ShieldCheck, GraduationCap, Briefcase } from 'lucide-react';
 
+// "url 320w, url 640w" from the API's image derivatives
+const srcSet = (variants, format) => Object.entries(variants || {}).map(([width, urls]) => `${urls[format]} ${width}w`).join(', ');
+
 const Landing = () => {
     const [courses, setCourses] = useState([]);
     const [filteredCourses, setFilteredCourses] = useState([]);
@@ -17,13 +20,12 @@ const Landing = () => {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const courseRes = await api.get('/courses/');
-                setCourses(courseRes.data);
-                setFilteredCourses(courseRes.data);
+                const courseRows = await fetchAll('/courses/catalog/');
+                setCourses(courseRows);
+                setFilteredCourses(courseRows);
 
                 if (role === 'Student') {
-                    const enrollRes = await api.get('/enrollments/');
-                    setEnrollments(enrollRes.data);
+                    setEnrollments(await fetchAll('/enrollments/'));
                 }
             } catch (err) {
                 console.error(err);
@@ -56,8 +58,7 @@ const Landing = () => {
         }
         try {
             await api.post('/enrollments/', { course: courseId });
-            const enrollRes = await api.get('/enrollments/');
-            setEnrollments(enrollRes.data);
+            setEnrollments(await fetchAll('/enrollments/'));
             alert("Enrolled successfully!");
         } catch (err) {
             const msg = err.response?.data ? JSON.stringify(err.response.data) : "Enrollment failed.";
@@ -197,7 +198,12 @@ const Landing = () => {
                         <div key={course.id} className="card fade-in card-hover" style={{ display: 'flex', flexDirection: 'column', padding: '1.5rem' }}>
                             <div style={{ position: 'relative', height: '200px', background: 'var(--primary-dark)', borderRadius: '1rem', marginBottom: '1.5rem', overflow: 'hidden' }}>
                                 {course.thumbnail ? (
-                                    <img src={course.thumbnail} alt={course.title} style={{ width: '100%', height: '100%', objectFit: 'cover' }} />
+                                    <picture>
+                                        {srcSet(course.thumbnail_variants, 'webp') && (
+                                            <source type="image/webp" srcSet={srcSet(course.thumbnail_variants, 'webp')} sizes="(min-width: 1024px) 33vw, 100vw" />
+                                        )}
+                                        <img src={course.thumbnail} srcSet={srcSet(course.thumbnail_variants, 'jpeg') || undefined} sizes="(min-width: 1024px) 33vw, 100vw" alt={course.title} loading="lazy" style={{ width: '100%', height: '100%', objectFit: 'cover' }} />
+                                    </picture>
                                 ) : (
                                     <div style={{ width: '100%', height: '100%', display: 'flex', alignItems: 'center', justifyContent: 'center', color: 'var(--text-muted)' }}>
                                         <BookOpen size={48} />
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
-import api from '../../api';
+import api, { fetchAll } from '../../api';
 
 const AdminDashboard = () => {
     const navigate = useNavigate();
@@ -17,16 +17,16 @@ const AdminDashboard = () => {
     useEffect(() => {
         const fetchAdminData = async () => {
             try {
-                const [usersRes, coursesRes] = await Promise.all([
-                    api.get('/users/'),
-                    api.get('/courses/')
+                const [userRows, courseRows] = await Promise.all([
+                    fetchAll('/users/'),
+                    fetchAll('/courses/catalog/')
                 ]);
-                setUsers(usersRes.data);
-                setCourses(coursesRes.data);
+                setUsers(userRows);
+                setCourses(courseRows);
                 setStats(prev => ({
                     ...prev,
-                    totalUsers: usersRes.data.length,
-                    totalCourses: coursesRes.data.length
+                    totalUsers: userRows.length,
+                    totalCourses: courseRows.length
                 }));
             } catch (err) {
                 console.error("Error fetching admin data", err);
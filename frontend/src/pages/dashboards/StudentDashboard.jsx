@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { Award, BookOpen, GraduationCap, Clock } from 'lucide-react';
 import { Link } from 'react-router-dom';
-import api from '../../api';
+import api, { fetchAll } from '../../api';
 import Navbar from '../../components/Navbar';
 
 const StudentDashboard = () => {
@@ -17,19 +17,19 @@ const StudentDashboard = () => {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const [enrollRes, certRes] = await Promise.all([
-                    api.get('/enrollments/'),
-                    api.get('/certificates/')
+                const [enrollRows, certRows] = await Promise.all([
+                    fetchAll('/enrollments/'),
+                    fetchAll('/certificates/')
                 ]);
 
-                setEnrollments(enrollRes.data);
-                setCertificates(certRes.data);
+                setEnrollments(enrollRows);
+                setCertificates(certRows);
 
-                const completedCount = enrollRes.data.filter(e => e.progress_percentage === 100).length;
-                const inProgressCount = enrollRes.data.length - completedCount;
+                const completedCount = enrollRows.filter(e => e.progress_percentage === 100).length;
+                const inProgressCount = enrollRows.length - completedCount;
 
                 setStats({
-                    totalCourses: enrollRes.data.length,
+                    totalCourses: enrollRows.length,
                     completed: completedCount,
                     inProgress: inProgressCount
                 });
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
-import api from '../../api';
+import api, { fetchAll } from '../../api';
 
 const TeacherDashboard = () => {
     const navigate = useNavigate();
@@ -41,11 +41,11 @@ const TeacherDashboard = () => {
         const fetchTeacherData = async () => {
             try {
                 // In a production app, the backend should return only courses taught by the user
-                const res = await api.get('/courses/');
+                const courseRows = await fetchAll('/courses/');
                 // For this demo, we'll show the courses if we are an instructor.
                 // Ideally backend handles filtering.
-                setCourses(res.data);
-                setStats(prev => ({ ...prev, activeCourses: res.data.length, totalStudents: res.data.length * 12 })); // Mock stats
+                setCourses(courseRows);
+                setStats(prev => ({ ...prev, activeCourses: courseRows.length, totalStudents: courseRows.length * 12 })); // Mock stats
             } catch (err) {
                 console.error("Error fetching teacher data", err);
             }